@@ -1,77 +1,253 @@
-import whisper
+import argparse
+import glob
+import multiprocessing
 import os
 import time
 import warnings  # Added to suppress warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import ffmpeg
+import formats
+import metrics
+import model_pool
+import pipeline
 
 # Suppress FP16 warning
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
 
 #  ("tiny", "base", "small", "medium", "large").
-def generate_subtitles(video_path, output_path, model_type):
+def generate_subtitles(video_path, output_path, model_type, workers=None, fmt="vtt", vad=None, dtype=None, profile=False):
     try:
-        print(f"Loading Whisper model ({model_type})...")
-        model = whisper.load_model(model_type)
-        print(f"Transcribing {video_path}...")
-        result = model.transcribe(video_path, task="translate")
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write("WEBVTT\n\n")
-            for segment in result["segments"]:
-                start_time = format_timestamp(segment["start"])
-                end_time = format_timestamp(segment["end"])
-                text = segment["text"]
-                f.write(f"{start_time} --> {end_time}\n{text}\n\n")
+        decode_started = [time.time()]
+        def show_stage(stage):
+            if stage == "cached":
+                print(f"Using cached subtitles for {video_path}")
+            elif stage == "extracting":
+                print(f"Extracting audio from {video_path}...")
+            elif stage == "filtering":
+                print(f"Detecting speech in {video_path}...")
+            elif stage == "loading":
+                print(f"Loading Whisper model ({model_type})...")
+            else:
+                print(f"Transcribing {video_path}...")
+                decode_started[0] = time.time()
+        def show_progress(done, total):
+            # Real-time factor and ETA from the audio decoded so far
+            rtf = (time.time() - decode_started[0]) / done if done else 0.0
+            eta = (total - done) * rtf
+            end = "\n" if done >= total else ""
+            print(f"\r  {done / total:6.1%} of {total / 60:.1f} min  RTF {rtf:.2f}  ETA {eta / 60:.1f} min", end=end, flush=True)
+        def show_skipped(skipped, total):
+            print(f"  Skipping {skipped / 60:.1f} of {total / 60:.1f} min as silence ({skipped / total if total else 0:.0%})")
+        # Profiles are written next to the subtitle file
+        profile_prefix = os.path.splitext(output_path)[0] + ".profile" if profile else None
+        segments = pipeline.stream(video_path, model_type, task="translate", on_status=show_stage, on_progress=show_progress,
+                                   on_skip=show_skipped, workers=workers, vad=vad, dtype=dtype, profile=profile_prefix)
+        # Cues are appended to a .part file as soon as each window is decoded,
+        # so it can be followed while a long file is still being transcribed.
+        # Only a complete file gets the final name: a partial one would be
+        # newer than the media and taken as up to date by the next run.
+        part_path = output_path + ".part"
+        try:
+            with open(part_path, "w", encoding="utf-8") as f:
+                formats.write(fmt, segments, f, flush=True)
+            os.replace(part_path, output_path)
+        finally:
+            # Also on Ctrl-C; closing the stream stops the transcription
+            segments.close()
+            if os.path.exists(part_path):
+                os.remove(part_path)
         print(f"Subtitles saved to {output_path}")
+        if profile_prefix:
+            print(f"Profile saved to {profile_prefix}.hotspots.txt (and .pstats, .stacks.txt, .trace.json)")
         return True
     except Exception as e:
         print(f"Error generating subtitles: {e}")
         return False
 
-def format_timestamp(seconds):
-    milliseconds = int((seconds - int(seconds)) * 1000)
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = int(seconds % 60)
-    return f"{hours:02}:{minutes:02}:{seconds:02}.{milliseconds:03}"
-
-def log_details(video_path, video_size, model_type, elapsed_time):
-    log_file = "subtitles_log.txt"
-    with open(log_file, "a", encoding="utf-8") as log:
-        hours, remainder = divmod(elapsed_time, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        log.write(f"Video File: {video_path}\n")
-        log.write(f"Video Size: {video_size:.2f} MB\n")
-        log.write(f"Model Used: {model_type}\n")
-        log.write(f"Time Taken: {int(hours)}h {int(minutes)}m {int(seconds)}s\n")
-        log.write("-" * 40 + "\n")
-
-def main():
+MEDIA_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v', '.mp3', '.wav', '.flac')
+
+def glob_root(pattern):
+    """Return the directory part of a glob pattern before its first wildcard"""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or "."
+
+def find_media(patterns):
+    """Expand files, glob patterns and directories into (media file, root) pairs
+
+    The root is the directory given or the fixed part of the glob pattern;
+    with --output-dir the subtitle files mirror the layout below it.
+    """
+    found = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = glob.glob(pattern, recursive=True)
+            base = glob_root(pattern)
+        else:
+            matches = [pattern]
+            base = pattern if os.path.isdir(pattern) else os.path.dirname(pattern) or "."
+        if not matches:
+            print(f"Warning: '{pattern}' did not match any file.")
+        for path in matches:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for name in sorted(files):
+                        if name.lower().endswith(MEDIA_EXTENSIONS):
+                            found.append((os.path.join(root, name), base))
+            elif os.path.exists(path):
+                found.append((path, base))
+            else:
+                print(f"Error: The file '{path}' does not exist.")
+    # Keep the first occurrence of every file, in the order given
+    unique = {}
+    for path, base in found:
+        unique.setdefault(os.path.abspath(path), os.path.abspath(base))
+    return list(unique.items())
+
+def subtitle_path(video_path, output_dir=None, fmt="vtt", root=None):
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    extension = formats.FORMATS[fmt][2]
+    directory = os.path.dirname(video_path)
+    if output_dir:
+        # Keep the layout below the root, so a/x.mp4 and b/x.mp4 do not clash
+        relative = os.path.relpath(directory, root or directory)
+        directory = os.path.normpath(os.path.join(output_dir, relative))
+    return os.path.join(directory, f"{video_name}{extension}")
+
+def find_collisions(targets):
+    """Return {subtitle file: media files} for subtitle files claimed more than once"""
+    claimed = {}
+    for video_path, subtitle_file in targets:
+        claimed.setdefault(os.path.abspath(subtitle_file), []).append(video_path)
+    return {path: videos for path, videos in claimed.items() if len(videos) > 1}
+
+def is_up_to_date(video_path, subtitle_file):
+    return os.path.exists(subtitle_file) and os.path.getmtime(subtitle_file) >= os.path.getmtime(video_path)
+
+def media_duration(video_path):
+    """Return the media duration in seconds, or 0 if ffprobe cannot read it"""
+    try:
+        return float(ffmpeg.probe(video_path)["format"]["duration"])
+    except Exception:
+        return 0.0
+
+def _init_worker(model_type, threads, dtype=None):
+    import torch
+    torch.set_num_threads(threads)
+    # Load the model once per worker; every file it handles reuses it
+    model_pool.get_model(model_type, dtype=dtype)
+
+def process_file(job):
+    video_path, subtitle_file, model_type, fmt, vad, dtype, profile, chunk_workers = job
+    start_time = time.time()
+    # Per-stage timings are recorded by the pipeline's own "transcribe" run
+    with metrics.run("file", media=video_path, size_mb=round(os.path.getsize(video_path) / (1024 * 1024), 2),
+                     model=model_type, format=fmt) as run:
+        ok = generate_subtitles(video_path, subtitle_file, model_type=model_type, workers=chunk_workers, fmt=fmt, vad=vad, dtype=dtype, profile=profile)
+        duration = media_duration(video_path)
+        run.note(ok=ok, media_seconds=duration)
+    elapsed_time = time.time() - start_time
+    return video_path, ok, duration, elapsed_time
+
+def report(results, result, total):
+    results.append(result)
+    print(f"[{len(results)}/{total}] {'Done' if result[1] else 'Failed'}: {result[0]}")
+
+def run_pool(jobs, workers, args, results):
+    """Process the jobs on `workers` processes, each loading the model once
+
+    A worker that dies, for example because the model cannot be loaded in its
+    initializer, breaks the pool: the files not yet done are reported as
+    failed instead of waiting forever for a replacement worker.
+    """
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+                               initargs=(args.model, threads, "int8" if args.int8 else None))
+    futures = {pool.submit(process_file, job + (1,)): job for job in jobs}
+    broken = False
+    try:
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                if not broken:
+                    print(f"Error: a worker process failed, possibly while loading the {args.model} model: {e}")
+                    broken = True
+                result = (futures[future][0], False, 0.0, 0.0)
+            report(results, result, len(jobs))
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate WebVTT subtitles for media files with Whisper.")
+    parser.add_argument("paths", nargs="*", help="Media files, glob patterns or directories (prompted for if omitted)")
+    parser.add_argument("--model", default="base", choices=["tiny", "base", "small", "medium", "large"], help="Whisper model size (default: base)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of files transcribed in parallel (default: 1)")
+    parser.add_argument("--format", default="vtt", choices=sorted(formats.FORMATS), help="Subtitle format (default: vtt)")
+    parser.add_argument("--output-dir", help="Directory for the subtitle files (default: next to each media file)")
+    parser.add_argument("--vad", action="store_true", default=None, help="Transcribe only detected speech, skipping silence (default: SUBGEN_VAD)")
+    parser.add_argument("--int8", action="store_true", help="Run a dynamically quantized int8 model on the CPU")
+    parser.add_argument("--profile", action="store_true", help="Profile each transcription with cProfile and the torch profiler; results are saved next to the subtitle file")
+    parser.add_argument("--force", action="store_true", help="Regenerate subtitles even if the file is up to date")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     start_time = time.time()
-    video_path = input("Enter the path to the MP4 file: ").strip()
-    if not os.path.exists(video_path):
-        print(f"Error: The file '{video_path}' does not exist.")
+    patterns = args.paths or [input("Enter the path to the MP4 file: ").strip()]
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    targets = [(video_path, subtitle_path(video_path, args.output_dir, args.format, root))
+               for video_path, root in find_media(patterns)]
+    # Two media files writing one subtitle file (x.mp4 and x.mkv) would
+    # overwrite each other and both count as done on the next run
+    collisions = find_collisions(targets)
+    if collisions:
+        for subtitle_file, videos in collisions.items():
+            print(f"Error: {subtitle_file} would be written for each of: {', '.join(videos)}")
+        raise SystemExit("Refusing to run: rename the media files or use separate output directories.")
+
+    jobs = []
+    skipped = 0
+    for video_path, subtitle_file in targets:
+        os.makedirs(os.path.dirname(subtitle_file), exist_ok=True)
+        if not args.force and is_up_to_date(video_path, subtitle_file):
+            skipped += 1
+            continue
+        jobs.append((video_path, subtitle_file, args.model, args.format, args.vad, "int8" if args.int8 else None, args.profile))
+    print(f"{len(jobs)} file(s) to process, {skipped} already up to date.")
+    if not jobs:
         return
-    
-    video_size = os.path.getsize(video_path) / (1024 * 1024)  # Get video file size in MB
-    print(f"Video file size: {video_size:.2f} MB")
-    
-    video_name = os.path.splitext(os.path.basename(video_path))[0]
-    subtitle_file = f"{video_name}.vtt"
-    model_type = "base"
-    if generate_subtitles(video_path, subtitle_file, model_type=model_type):
-        subtitle_size = os.path.getsize(subtitle_file) / (1024)  # Get subtitle file size in KB
-        print(f"Subtitles generated successfully and saved to '{subtitle_file}'.")
-        print(f"Subtitle file size: {subtitle_size:.2f} KB")
+
+    workers = max(1, min(args.workers, len(jobs)))
+    results = []
+    if workers == 1:
+        # One file at a time in this process; long files may still be split
+        # across chunk workers (SUBGEN_WORKERS)
+        for job in jobs:
+            report(results, process_file(job + (None,)), len(jobs))
     else:
-        print("Failed to generate subtitles.")
-    
+        run_pool(jobs, workers, args, results)
+
+    failed = [video_path for video_path, ok, _, _ in results if not ok]
+    media_seconds = sum(duration for _, ok, duration, _ in results if ok)
+
     end_time = time.time()
     elapsed_time = end_time - start_time
     hours, remainder = divmod(elapsed_time, 3600)
     minutes, seconds = divmod(remainder, 60)
+    print(f"Processed {len(results) - len(failed)} file(s), {len(failed)} failed.")
+    for video_path in failed:
+        print(f"  Failed: {video_path}")
     print(f"Total execution time: {int(hours)}h {int(minutes)}m {int(seconds)}s")
-    
-    # Log details
-    log_details(video_path, video_size, model_type, elapsed_time)
+    if elapsed_time > 0:
+        print(f"Throughput: {media_seconds / elapsed_time:.2f} media-hours per wall-hour "
+              f"({media_seconds / 3600:.2f} h of media in {elapsed_time / 3600:.2f} h)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+import os
+import threading
+
+import numpy as np
+
+import disk_cache
+import metrics
+import result_cache
+import settings
+
+# One-time audio extraction. The first transcription of a media file decodes
+# its audio track to mono 16 kHz 16-bit PCM; every later run, whatever the
+# model or task, reads that artifact instead of demuxing and decoding the
+# container again. Artifacts are keyed by the SHA-256 of the media bytes and
+# kept under CACHE_DIR/audio, trimmed least recently used first to
+# AUDIO_CACHE_MB, so batch runs never write next to the media.
+
+SAMPLE_RATE = 16000
+PCM_SUFFIX = ".16k.pcm"
+
+
+def cache_dir():
+    """Return the directory holding extracted audio, creating it if needed"""
+    path = os.path.join(settings.CACHE_DIR, "audio")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def pcm_path(digest):
+    """Return where the extracted audio for media with this content digest is cached"""
+    return os.path.join(cache_dir(), digest + PCM_SUFFIX)
+
+
+def extract_audio(media_path, digest=None):
+    """Decode the audio track to cached 16 kHz mono PCM and return its path
+
+    `digest` is the media's content digest, when the caller already has it.
+    """
+    path = pcm_path(digest or result_cache.file_digest(media_path))
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        disk_cache.touch(path)
+        metrics.note(pcm_cache="hit")
+        return path
+    metrics.note(pcm_cache="miss")
+    import ffmpeg
+    # Unique name so concurrent extractions of one file do not clobber each other
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        (
+            ffmpeg.input(media_path, threads=0)
+            .output(tmp_path, format="s16le", acodec="pcm_s16le", ac=1, ar=SAMPLE_RATE, vn=None)
+            .overwrite_output()
+            .run(cmd="ffmpeg", capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"Failed to extract audio: {e.stderr.decode(errors='replace')}") from e
+    os.replace(tmp_path, path)
+    disk_cache.trim(cache_dir(), settings.AUDIO_CACHE_MB * 1024 * 1024, suffixes=[PCM_SUFFIX], keep=[path])
+    return path
+
+
+def read_pcm(path):
+    """Return extracted PCM audio as float32 samples in [-1, 1]"""
+    return np.fromfile(path, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def load_audio(media_path):
+    """Return the audio of a media file as float32 samples in [-1, 1]"""
+    return read_pcm(extract_audio(media_path))
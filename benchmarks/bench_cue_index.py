@@ -0,0 +1,79 @@
+"""Compare CueIndex lookups with the linear scan in get_subtitle_at_time.
+
+Usage: python benchmarks/bench_cue_index.py [--cues 1000 10000 100000] [--lookups 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cue_index import CueIndex  # noqa: E402
+
+
+def linear_scan(subtitles, current_time):
+    # The lookup get_subtitle_at_time did before the index existed
+    for subtitle in subtitles:
+        if subtitle['start'] <= current_time <= subtitle['end']:
+            return subtitle['text']
+    return ""
+
+
+def make_subtitles(count, overlap=0.1):
+    """Return `count` back-to-back cues of 1-5 s, a share of them overlapping"""
+    subtitles = []
+    t = 0.0
+    for i in range(count):
+        duration = random.uniform(1.0, 5.0)
+        start = t - random.uniform(0.0, 1.0) if random.random() < overlap and i else t
+        subtitles.append({'start': start, 'end': start + duration, 'text': f"cue {i}"})
+        t = start + duration + random.uniform(0.0, 0.5)
+    return subtitles
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cues", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    random.seed(0)
+
+    print(f"{'cues':>8} {'build ms':>9} {'scan us':>9} {'index us':>9} {'speedup':>8} {'window us':>10} {'edit us':>8}")
+    for count in args.cues:
+        subtitles = make_subtitles(count)
+        duration = subtitles[-1]['end']
+        times = [random.uniform(0, duration) for _ in range(args.lookups)]
+
+        build = timed(lambda: CueIndex(subtitles), 3)
+        index = CueIndex(subtitles)
+
+        for t in times:
+            cue_id = index.first_at(t)
+            assert linear_scan(subtitles, t) == (subtitles[cue_id]['text'] if cue_id is not None else "")
+
+        scan = timed(lambda: [linear_scan(subtitles, t) for t in times], 1) / len(times)
+        lookup = timed(lambda: [index.first_at(t) for t in times], 3) / len(times)
+        window = timed(lambda: [index.between(t, t + 30.0) for t in times], 3) / len(times)
+
+        def edit():
+            cue_id = random.randrange(count)
+            start, end = subtitles[cue_id]['start'], subtitles[cue_id]['end']
+            index.update(cue_id, start + 0.25, end + 0.25)
+            index.update(cue_id, start, end)
+        edits = timed(edit, 200) / 2
+
+        print(f"{count:>8} {build * 1e3:>9.1f} {scan * 1e6:>9.1f} {lookup * 1e6:>9.2f} "
+              f"{scan / lookup:>7.0f}x {window * 1e6:>10.2f} {edits * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare int8 quantized and FP32 Whisper inference on the CPU: speed and word error rate.
+
+WER is measured against a reference transcript when one is given, otherwise
+against the FP32 output. The first int8 run also converts and caches the
+quantized weights; later runs load them from the cache.
+
+Usage: python benchmarks/bench_int8.py MEDIA [--model base] [--reference transcript.txt] [--task transcribe]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio  # noqa: E402
+import model_pool  # noqa: E402
+
+
+def words(text):
+    return re.findall(r"[\w']+", text.lower())
+
+
+def word_error_rate(reference, hypothesis):
+    """Return the word-level edit distance divided by the reference length"""
+    ref, hyp = words(reference), words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+
+def run(samples, model_type, dtype, task):
+    started = time.perf_counter()
+    model = model_pool.get_model(model_type, device="cpu", dtype=dtype)
+    loaded = time.perf_counter()
+    result = model.transcribe(samples, task=task, fp16=False)
+    finished = time.perf_counter()
+    return {
+        'load': loaded - started,
+        'decode': finished - loaded,
+        'size_mb': model_pool._model_mb(model),
+        'text': " ".join(segment["text"].strip() for segment in result["segments"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("media", help="Audio or video file to transcribe")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--reference", help="Text file with the correct transcript")
+    parser.add_argument("--task", default="transcribe", choices=["transcribe", "translate"])
+    args = parser.parse_args()
+
+    samples = audio.load_audio(args.media)
+    duration = len(samples) / audio.SAMPLE_RATE
+    results = {}
+    for dtype in ("fp32", "int8"):
+        results[dtype] = run(samples, args.model, dtype, args.task)
+        model_pool.clear()
+
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference, against = f.read(), "reference"
+    else:
+        reference, against = results["fp32"]["text"], "FP32 output"
+
+    print(f"{duration:.1f} s of audio, model {args.model}, WER against the {against}")
+    print(f"{'dtype':<6} {'load s':>7} {'decode s':>9} {'RTF':>6} {'size MB':>8} {'WER':>7}")
+    for dtype, result in results.items():
+        wer = word_error_rate(reference, result["text"])
+        print(f"{dtype:<6} {result['load']:>7.2f} {result['decode']:>9.2f} {result['decode'] / duration:>6.3f} "
+              f"{result['size_mb']:>8.0f} {wer:>7.2%}")
+    print(f"int8 speedup: {results['fp32']['decode'] / results['int8']['decode']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
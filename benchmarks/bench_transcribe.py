@@ -0,0 +1,211 @@
+"""Transcription benchmark: real-time factor, peak RSS, model-load and serialization time.
+
+Runs every combination of clip length, model size, precision and execution
+mode, each in a fresh interpreter so that model loads are cold and peak RSS
+belongs to that run alone. Clips are cut from --sample (tiled to length) or,
+without one, synthesized from seeded speech-like noise, which gives stable
+timings but meaningless text. Results are written as JSON; with --baseline
+they are compared with an earlier run and the exit status is 1 if any
+configuration regressed by more than --tolerance.
+
+Usage:
+  python benchmarks/bench_transcribe.py --models tiny base --lengths 30 120 \\
+      --dtypes fp32 int8 --modes single chunked --threads 1 4 \\
+      [--sample speech.wav] [--output results.json] [--baseline baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Metrics compared with the baseline; all of them are better when lower
+COMPARED = ["rtf", "load_s", "peak_rss_mb", "serialize_ms"]
+
+
+def make_clip(seconds, sample=None, seed=0):
+    """Return `seconds` of 16 kHz audio, tiled from a sample or synthesized"""
+    import numpy as np
+    import audio
+    count = int(seconds * audio.SAMPLE_RATE)
+    if sample:
+        source = audio.load_audio(sample)
+        return np.resize(source, count).astype(np.float32)
+    # Syllable-rate bursts of a few harmonics with pauses between phrases
+    rng = np.random.default_rng(seed)
+    t = np.arange(count) / audio.SAMPLE_RATE
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / audio.SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.2 * t) > -0.5)
+    noise = 0.01 * rng.standard_normal(count)
+    return (0.2 * voice * envelope + noise).astype(np.float32)
+
+
+def peak_rss_mb():
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Kilobytes on Linux, bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def run_one(config):
+    """Run one configuration in this process and return its metrics"""
+    import chunked
+    import formats
+    import model_pool
+    import torch
+    from vtt_buffer import VttBuffer
+
+    samples = make_clip(config["length"], config.get("sample"))
+    duration = len(samples) / chunked.SAMPLE_RATE
+    dtype = None if config["dtype"] == "fp32" else config["dtype"]
+    torch.set_num_threads(config["threads"])
+
+    started = time.perf_counter()
+    if config["mode"] == "chunked":
+        # Waits for the workers to load their model, keeping it out of the decode time
+        chunked.load(config["model"], config["threads"], dtype)
+    else:
+        model = model_pool.get_model(config["model"], device="cpu", dtype=dtype)
+    loaded = time.perf_counter()
+
+    if config["mode"] == "chunked":
+        segments = chunked.transcribe(samples, config["model"], config["threads"], task="transcribe",
+                                      chunk_seconds=config["chunk_seconds"], dtype=dtype, fp16=False)
+        chunked.shutdown()
+    else:
+        result = model.transcribe(samples, task="transcribe", fp16=False)
+        segments = [{'start': s["start"], 'end': s["end"], 'text': s["text"].strip()} for s in result["segments"]]
+    decoded = time.perf_counter()
+
+    for fmt in formats.FORMATS:
+        formats.dumps(fmt, segments)
+    VttBuffer(segments).getvalue()
+    serialized = time.perf_counter()
+
+    return dict(
+        config,
+        audio_s=duration,
+        load_s=loaded - started,
+        decode_s=decoded - loaded,
+        rtf=(decoded - loaded) / duration,
+        serialize_ms=(serialized - decoded) * 1000,
+        segments=len(segments),
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def config_key(config):
+    return "{model}/{dtype}/{mode}/t{threads}/{length}s".format(**config)
+
+
+def configurations(args):
+    for length in args.lengths:
+        for model in args.models:
+            for dtype in args.dtypes:
+                for mode in args.modes:
+                    # In chunked mode the thread count is the number of worker processes
+                    for threads in args.threads:
+                        yield {
+                            "length": length, "model": model, "dtype": dtype, "mode": mode,
+                            "threads": threads, "chunk_seconds": args.chunk_seconds,
+                            "sample": os.path.abspath(args.sample) if args.sample else None,
+                        }
+
+
+def compare(results, baseline, tolerance):
+    """Return a line per metric that got worse than the baseline by more than tolerance
+
+    A configuration that ran in the baseline but now fails or is missing
+    counts as a regression too.
+    """
+    current = {config_key(run): run for run in results["runs"]}
+    regressions = []
+    for old in baseline["runs"]:
+        if "error" in old:
+            continue
+        run = current.get(config_key(old))
+        if run is None:
+            regressions.append(f"{config_key(old)}: ran in the baseline but is missing")
+            continue
+        if "error" in run:
+            regressions.append(f"{config_key(old)}: ran in the baseline but now fails: {' '.join(run['error'])}")
+            continue
+        for metric in COMPARED:
+            if old.get(metric) and run[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{config_key(run)} {metric}: {old[metric]:.3f} -> {run[metric]:.3f} "
+                                   f"(+{run[metric] / old[metric] - 1:.0%})")
+    return regressions
+
+
+def environment():
+    info = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+    try:
+        import torch
+        info["torch"] = torch.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=["tiny", "base"])
+    parser.add_argument("--lengths", nargs="+", type=int, default=[30, 120], help="Clip lengths in seconds")
+    parser.add_argument("--dtypes", nargs="+", default=["fp32", "int8"], choices=["fp32", "int8"])
+    parser.add_argument("--modes", nargs="+", default=["single", "chunked"], choices=["single", "chunked"])
+    parser.add_argument("--threads", nargs="+", type=int, default=sorted({1, os.cpu_count() or 1}),
+                        help="torch threads in single mode, worker processes in chunked mode")
+    parser.add_argument("--chunk-seconds", type=int, default=30)
+    parser.add_argument("--sample", help="Speech recording the clips are cut from")
+    parser.add_argument("--output", help="Write the results here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before a regression (default: 0.10)")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(json.loads(args.run_one))))
+        return
+
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(), "runs": []}
+    for config in configurations(args):
+        print(f"Running {config_key(config)}...", file=sys.stderr)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-one", json.dumps(config)],
+                             cwd=ROOT, capture_output=True, text=True)
+        if out.returncode != 0:
+            print(out.stderr, file=sys.stderr)
+            results["runs"].append(dict(config, error=out.stderr.strip().splitlines()[-1:]))
+            continue
+        run = json.loads(out.stdout.strip().splitlines()[-1])
+        results["runs"].append(run)
+        print(f"  RTF {run['rtf']:.3f}  load {run['load_s']:.1f} s  peak RSS {run['peak_rss_mb']:.0f} MB  "
+              f"serialize {run['serialize_ms']:.1f} ms", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
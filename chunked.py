@@ -0,0 +1,272 @@
+import itertools
+import sys
+import threading
+import types
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+import multiprocessing
+
+import numpy as np
+
+import audio
+import scheduler
+import settings
+
+# Chunked transcription engine. Long media is cut into chunks at silence
+# boundaries, the chunks are transcribed in a pool of worker processes that
+# each keep their own model, and the segments are stitched back together on
+# the original timeline. Transcriptions running side by side share the pool
+# for their model; a pool is only stopped once no transcription is using it.
+
+SAMPLE_RATE = audio.SAMPLE_RATE
+FRAME_SECONDS = 0.03
+WAIT_SECONDS = 1.0          # how often waiting for workers checks for cancellation
+
+_pools = {}             # (model, workers, dtype) -> ProcessPoolExecutor
+_pool_users = {}        # (model, workers, dtype) -> transcriptions using the pool
+_pool_lock = threading.Lock()
+_worker_model = None
+
+
+def frame_energy(samples, frame_seconds=FRAME_SECONDS):
+    """Return the mean energy of consecutive frames of a 16 kHz signal"""
+    frame = int(SAMPLE_RATE * frame_seconds)
+    count = len(samples) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:count * frame].reshape(count, frame)
+    return np.mean(frames * frames, axis=1)
+
+
+def split_points(samples, chunk_seconds=None, search_seconds=None):
+    """Return (start, end) sample ranges cut at the quietest nearby frame"""
+    chunk_seconds = chunk_seconds or settings.CHUNK_SECONDS
+    search_seconds = settings.CHUNK_SEARCH_SECONDS if search_seconds is None else search_seconds
+    total = len(samples)
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    if total <= chunk:
+        return [(0, total)]
+
+    energy = frame_energy(samples)
+    frame = int(SAMPLE_RATE * FRAME_SECONDS)
+    search = int(search_seconds / FRAME_SECONDS)
+
+    cuts = [0]
+    while total - cuts[-1] > chunk:
+        target = (cuts[-1] + chunk) // frame
+        lo = max(cuts[-1] // frame + 1, target - search)
+        hi = min(len(energy), target + search + 1)
+        if lo >= hi:
+            cut = cuts[-1] + chunk
+        else:
+            cut = (lo + int(np.argmin(energy[lo:hi]))) * frame
+        cuts.append(cut)
+    cuts.append(total)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def stitch(chunk_segments, last_end=0.0):
+    """Merge per-chunk segment lists, already on the global timeline, in order
+
+    Segments are clamped so that start and end times never go backwards, even
+    where the model's timestamps overrun a chunk boundary. `last_end` is the
+    end of the segments stitched before, when stitching incrementally.
+    """
+    subtitles = []
+    for segments in chunk_segments:
+        for segment in segments:
+            start = max(segment['start'], last_end)
+            end = max(segment['end'], start)
+            subtitles.append({'start': start, 'end': end, 'text': segment['text']})
+            last_end = end
+    return subtitles
+
+
+def _init_worker(model_type, threads, dtype=None):
+    global _worker_model
+    import torch
+    import whisper
+    torch.set_num_threads(threads)
+    if dtype == "int8":
+        import quantize
+        _worker_model = quantize.load_quantized(model_type)
+    else:
+        _worker_model = whisper.load_model(model_type, device="cpu")
+
+
+def _transcribe_chunk(args):
+    index, samples, offset, duration, threads, task, decode_options = args
+    # The submitting job's current share of the cores, split between its workers
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+    result = _worker_model.transcribe(samples, task=task, **decode_options)
+    segments = []
+    for segment in result["segments"]:
+        start = min(segment["start"], duration)
+        end = min(segment["end"], duration)
+        segments.append({
+            'start': offset + start,
+            'end': offset + end,
+            'text': segment["text"].strip()
+        })
+    return index, duration, segments
+
+
+@contextmanager
+def _neutral_main():
+    """Stop spawned workers from re-running the launching script
+
+    Spawned children import the parent's __main__ by path. Under Streamlit
+    that is the app script itself, so it is hidden while workers start.
+    """
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _ping():
+    return True
+
+
+def _broken(key, pool, error):
+    """Forget a pool whose workers died and return the error to raise"""
+    with _pool_lock:
+        if _pools.get(key) is pool:
+            del _pools[key]
+    pool.shutdown(wait=False, cancel_futures=True)
+    return RuntimeError(f"Chunk worker processes for the {key[0]} model failed, "
+                        f"possibly while loading the model: {error}")
+
+
+def _wait(futures, on_wait):
+    """Wait for the first of `futures` to finish, calling on_wait() about every second"""
+    while True:
+        done, _ = wait(futures, timeout=WAIT_SECONDS, return_when=FIRST_COMPLETED)
+        if done:
+            return done
+        if on_wait is not None:
+            on_wait()
+
+
+def get_pool(model_type, workers, dtype=None):
+    """Return the worker pool for a model, stopping idle pools for other ones"""
+    key = (model_type, workers, dtype)
+    with _pool_lock:
+        pool = _pools.get(key)
+        if pool is not None:
+            return pool
+        for other in [k for k in _pools if not _pool_users.get(k)]:
+            _pools.pop(other).shutdown(wait=False, cancel_futures=True)
+        threads = max(1, scheduler.share() // workers)
+        ctx = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                                   initargs=(model_type, threads, dtype))
+        # Workers are started on demand; one ping each starts them all now,
+        # while __main__ is hidden, and none are started later
+        with _neutral_main():
+            pool.pings = [pool.submit(_ping) for _ in range(workers)]
+        _pools[key] = pool
+        return pool
+
+
+def load(model_type, workers, dtype=None, on_wait=None):
+    """Start the worker pool for a model and wait until a worker has loaded it
+
+    Raises RuntimeError if the workers fail to start, for instance because
+    the model cannot be loaded.
+    """
+    key = (model_type, workers, dtype)
+    pool = get_pool(model_type, workers, dtype)
+    try:
+        next(iter(_wait(pool.pings, on_wait))).result()
+    except BrokenProcessPool as e:
+        raise _broken(key, pool, e) from e
+
+
+@contextmanager
+def _using_pool(model_type, workers, dtype):
+    key = (model_type, workers, dtype)
+    # Counted before the pool is looked up, so no other job can stop it in between
+    with _pool_lock:
+        _pool_users[key] = _pool_users.get(key, 0) + 1
+    try:
+        yield get_pool(model_type, workers, dtype)
+    finally:
+        with _pool_lock:
+            _pool_users[key] -= 1
+
+
+def shutdown():
+    """Stop the worker pools; only for when no transcription is running"""
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+
+def transcribe(samples, model_type, workers, task="translate", chunk_seconds=None, on_progress=None, on_segment=None,
+               on_wait=None, dtype=None, **decode_options):
+    """Transcribe 16 kHz samples in parallel chunks and return stitched segments
+
+    `on_progress(done_s, total_s)` is called as chunks finish, and
+    `on_segment` with each stitched segment once every chunk before it is
+    done. `on_wait()` is called about every second while waiting, so a job
+    can be cancelled even while no chunk finishes. At most one chunk per
+    worker is queued at a time, so if a callback raises (as on cancellation)
+    only the chunks already running finish, and the pool stays up for the
+    other transcriptions using it. Raises RuntimeError if the workers die.
+    """
+    tasks = []
+    for index, (start, end) in enumerate(split_points(samples, chunk_seconds)):
+        offset = start / SAMPLE_RATE
+        duration = (end - start) / SAMPLE_RATE
+        tasks.append((index, samples[start:end], offset, duration, task, decode_options))
+    # Worker threads follow the job's share of the cores as other jobs come and
+    # go, so concurrent chunked jobs do not each use every core
+    pending = ((index, chunk, offset, duration, max(1, scheduler.share() // workers), task, decode_options)
+               for index, chunk, offset, duration, task, decode_options in tasks)
+    total = len(samples) / SAMPLE_RATE
+    key = (model_type, workers, dtype)
+
+    results = [None] * len(tasks)
+    subtitles = []
+    next_index = 0
+    done = 0.0
+    running = set()
+
+    with _using_pool(model_type, workers, dtype) as pool:
+        try:
+            for task in itertools.islice(pending, workers):
+                running.add(pool.submit(_transcribe_chunk, task))
+            while running:
+                for future in _wait(running, on_wait):
+                    running.remove(future)
+                    index, duration, segments = future.result()
+                    task = next(pending, None)
+                    if task is not None:
+                        running.add(pool.submit(_transcribe_chunk, task))
+                    results[index] = segments
+                    # Stitch every chunk whose predecessors are all finished
+                    while next_index < len(results) and results[next_index] is not None:
+                        last_end = subtitles[-1]['end'] if subtitles else 0.0
+                        for segment in stitch([results[next_index]], last_end):
+                            subtitles.append(segment)
+                            if on_segment is not None:
+                                on_segment(segment)
+                        results[next_index] = ()
+                        next_index += 1
+                    done += duration
+                    if on_progress is not None:
+                        on_progress(done, total)
+        except BrokenProcessPool as e:
+            raise _broken(key, pool, e) from e
+        finally:
+            # Chunks not started yet are dropped; the pool serves other jobs
+            for future in running:
+                future.cancel()
+    return subtitles
@@ -0,0 +1,110 @@
+from bisect import bisect_left, bisect_right
+
+# Sorted interval index over subtitle cues for time-to-cue lookups. Cues are
+# kept ordered by start time next to a running maximum of their end times, so
+# a point or window query is a binary search followed by a short backwards
+# walk that stops as soon as no earlier cue can still be on screen.
+# Overlapping cues are supported. Cues are identified by their position in
+# the subtitle list; text edits leave the index untouched.
+
+
+class CueIndex:
+    def __init__(self, subtitles=()):
+        entries = sorted((s['start'], s['end'], i) for i, s in enumerate(subtitles))
+        self._starts = [start for start, _, _ in entries]
+        self._ends = [end for _, end, _ in entries]
+        self._ids = [cue_id for _, _, cue_id in entries]
+        self._spans = {cue_id: (start, end) for start, end, cue_id in entries}
+        self._max_ends = []
+        running = float("-inf")
+        for end in self._ends:
+            running = max(running, end)
+            self._max_ends.append(running)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _fix_max_ends(self, pos):
+        # _max_ends[i] is the latest end time among the first i + 1 cues. After
+        # a change at pos the old values further on are still right as soon as
+        # one of them matches the recomputed value, so the walk stops there.
+        running = self._max_ends[pos - 1] if pos else float("-inf")
+        for i in range(pos, len(self._ends)):
+            value = max(running, self._ends[i])
+            if i > pos and self._max_ends[i] == value:
+                break
+            self._max_ends[i] = value
+            running = value
+
+    def _position(self, cue_id):
+        start, end = self._spans[cue_id]
+        pos = bisect_left(self._starts, start)
+        while self._ids[pos] != cue_id:
+            pos += 1
+        return pos
+
+    def _overlapping_before(self, pos, t):
+        """Return ids of cues before position pos whose end is at or after t"""
+        found = []
+        pos -= 1
+        while pos >= 0 and self._max_ends[pos] >= t:
+            if self._ends[pos] >= t:
+                found.append(self._ids[pos])
+            pos -= 1
+        found.reverse()
+        return found
+
+    def at(self, t):
+        """Return the ids of all cues showing at time t, by start time"""
+        return self._overlapping_before(bisect_right(self._starts, t), t)
+
+    def first_at(self, t):
+        """Return the id of the earliest listed cue showing at time t, or None"""
+        ids = self.at(t)
+        return min(ids) if ids else None
+
+    def next_at(self, t):
+        """Return the id of the cue showing at time t, else the next one to start, or None"""
+        cue_id = self.first_at(t)
+        if cue_id is not None:
+            return cue_id
+        pos = bisect_right(self._starts, t)
+        return self._ids[pos] if pos < len(self._ids) else None
+
+    def between(self, t0, t1):
+        """Return the ids of all cues overlapping [t0, t1], by start time"""
+        lo = bisect_left(self._starts, t0)
+        hi = bisect_right(self._starts, t1)
+        return self._overlapping_before(lo, t0) + self._ids[lo:hi]
+
+    def insert(self, cue_id, start, end):
+        """Add a cue"""
+        pos = bisect_right(self._starts, start)
+        self._starts.insert(pos, start)
+        self._ends.insert(pos, end)
+        self._ids.insert(pos, cue_id)
+        self._max_ends.insert(pos, end)
+        self._spans[cue_id] = (start, end)
+        self._fix_max_ends(pos)
+
+    def remove(self, cue_id):
+        """Drop a cue"""
+        pos = self._position(cue_id)
+        del self._starts[pos], self._ends[pos], self._ids[pos], self._max_ends[pos]
+        del self._spans[cue_id]
+        if pos < len(self._ends):
+            self._fix_max_ends(pos)
+
+    def update(self, cue_id, start, end):
+        """Move a cue to new start and end times"""
+        if self._spans.get(cue_id) == (start, end):
+            return
+        pos = self._position(cue_id)
+        if start == self._starts[pos]:
+            # Same place in the order; only the end time changes
+            self._ends[pos] = end
+            self._spans[cue_id] = (start, end)
+            self._fix_max_ends(pos)
+            return
+        self.remove(cue_id)
+        self.insert(cue_id, start, end)
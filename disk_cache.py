@@ -0,0 +1,51 @@
+import os
+import time
+
+# Helpers shared by the on-disk caches. Entries are plain files and the later
+# of their access and modification times is the last-used time for LRU
+# eviction. Touching only moves the access time, so freshness checks that
+# compare modification times (such as the extracted audio) are unaffected.
+
+
+def touch(path):
+    """Mark a cache entry as recently used"""
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+    except OSError:
+        pass
+
+
+def trim(directory, max_bytes, suffixes=None, keep=()):
+    """Delete least recently used files until the directory fits in max_bytes
+
+    Only files ending in one of `suffixes` count when it is given, and paths in
+    `keep` are never deleted.
+    """
+    entries = []
+    try:
+        scan = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in scan:
+        # Files still being written are never part of the cache
+        if not entry.is_file() or entry.name.endswith(".tmp"):
+            continue
+        if suffixes and not entry.name.endswith(tuple(suffixes)):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    keep = {os.path.abspath(path) for path in keep}
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
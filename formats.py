@@ -0,0 +1,113 @@
+import json
+
+# Subtitle serializers. Every format is a generator of text chunks, one per
+# cue, so output can be written straight to a file object as segments arrive
+# and building a whole document costs a single join. Segments are dicts with
+# 'start' and 'end' in seconds and 'text'.
+
+
+def format_timestamp(seconds, separator="."):
+    """Convert seconds to a HH:MM:SS.mmm timestamp (VTT; SRT uses ',')"""
+    # Rounded to whole milliseconds first: 3723.999 is not 01:02:03.998
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    whole, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02}:{minutes:02}:{whole:02}{separator}{milliseconds:03}"
+
+
+def _ass_timestamp(seconds):
+    centiseconds = int(round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    seconds, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02}:{seconds:02}.{centiseconds:02}"
+
+
+def vtt_cue(segment):
+    """Return one WebVTT cue, including its trailing blank line"""
+    return f"{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n{segment['text']}\n\n"
+
+
+VTT_HEADER = "WEBVTT\n\n"
+
+
+def iter_vtt(segments):
+    """Yield a WebVTT document chunk by chunk"""
+    yield VTT_HEADER
+    for segment in segments:
+        yield vtt_cue(segment)
+
+
+def iter_srt(segments):
+    """Yield a SubRip document chunk by chunk"""
+    for index, segment in enumerate(segments, 1):
+        start = format_timestamp(segment['start'], ",")
+        end = format_timestamp(segment['end'], ",")
+        yield f"{index}\n{start} --> {end}\n{segment['text']}\n\n"
+
+
+def iter_json(segments):
+    """Yield a JSON array of segments chunk by chunk"""
+    yield "["
+    separator = "\n  "
+    for segment in segments:
+        yield separator + json.dumps(segment, ensure_ascii=False)
+        separator = ",\n  "
+    yield "\n]\n"
+
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 1920
+PlayResY: 1080
+WrapStyle: 0
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,56,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,2,1,2,40,40,50,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def iter_ass(segments):
+    """Yield an Advanced SubStation Alpha document chunk by chunk"""
+    yield ASS_HEADER
+    for segment in segments:
+        # Braces start override blocks in ASS, and line breaks are written as \N
+        text = segment['text'].replace("{", "(").replace("}", ")").replace("\n", "\\N")
+        yield f"Dialogue: 0,{_ass_timestamp(segment['start'])},{_ass_timestamp(segment['end'])},Default,,0,0,0,,{text}\n"
+
+
+# Format name -> (chunk generator, MIME type, file extension)
+FORMATS = {
+    "vtt": (iter_vtt, "text/vtt", ".vtt"),
+    "srt": (iter_srt, "application/x-subrip", ".srt"),
+    "json": (iter_json, "application/json", ".json"),
+    "ass": (iter_ass, "text/x-ssa", ".ass"),
+}
+
+
+def iter_chunks(fmt, segments):
+    """Yield the chunks of a document in the given format"""
+    return FORMATS[fmt][0](segments)
+
+
+def write(fmt, segments, f, flush=False):
+    """Write segments to an open text file, optionally flushing every cue"""
+    for chunk in iter_chunks(fmt, segments):
+        f.write(chunk)
+        if flush:
+            f.flush()
+
+
+def dumps(fmt, segments):
+    """Return a whole document as a string"""
+    return "".join(iter_chunks(fmt, segments))
+
+
+def to_vtt(segments):
+    """Return a WebVTT document as a string"""
+    return "".join(iter_vtt(segments))
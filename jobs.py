@@ -0,0 +1,211 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import scheduler
+import settings
+
+# Background job queue for transcriptions. Jobs run on a worker pool shared by
+# every Streamlit session, so the script thread only submits work and polls its
+# status. Jobs are deduplicated by key: submitting the same media and settings
+# again, for example after a browser refresh, returns the job already running.
+# At most MAX_CONCURRENT_JOBS run at once and JOB_QUEUE_LIMIT wait; beyond
+# that submit() refuses new work rather than letting the queue grow.
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been asked to stop"""
+
+    # Recorded by metrics.run() as a cancelled run rather than an error
+    run_status = "cancelled"
+
+
+class QueueFull(Exception):
+    """Raised by submit() when too many jobs are already waiting"""
+
+
+class Job:
+    def __init__(self, key, meta=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.meta = meta or {}
+        self.status = "queued"   # queued, running, done, failed or cancelled
+        self.stage = "queued"
+        self.result = None
+        self.partial = []           # segments decoded so far
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.audio_done = 0.0       # seconds of audio decoded so far
+        self.audio_total = 0.0
+        self.decode_started = None
+        self.audio_skipped = 0.0    # seconds of silence left out by VAD
+        self._cancel = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if the job has been asked to stop"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def set_stage(self, stage):
+        """Record the current stage; also a cancellation point"""
+        self.check_cancelled()
+        scheduler.rebalance()
+        self.stage = stage
+        if stage == "transcribing":
+            self.decode_started = time.time()
+
+    def set_progress(self, done, total):
+        """Record decoder progress; called after every decoded window"""
+        self.check_cancelled()
+        scheduler.rebalance()
+        self.audio_done = done
+        self.audio_total = total
+
+    def set_skipped(self, skipped, total):
+        """Record how much of the audio voice activity detection left out"""
+        self.audio_skipped = skipped
+
+    def add_segment(self, segment):
+        """Record a segment as soon as its window is decoded"""
+        self.partial.append(segment)
+
+    @property
+    def fraction(self):
+        """Return the share of the audio decoded so far, between 0 and 1"""
+        if self.audio_total <= 0:
+            return 1.0 if self.status == "done" else 0.0
+        return min(1.0, self.audio_done / self.audio_total)
+
+    @property
+    def real_time_factor(self):
+        """Return processing seconds per second of audio, or None"""
+        if not self.decode_started or self.audio_done <= 0:
+            return None
+        return (time.time() - self.decode_started) / self.audio_done
+
+    @property
+    def eta(self):
+        """Return the estimated seconds left, or None"""
+        rtf = self.real_time_factor
+        if rtf is None:
+            return None
+        return max(0.0, (self.audio_total - self.audio_done) * rtf)
+
+
+_executor = None
+_local = threading.local()     # the job running on this thread
+_jobs = {}      # job id -> Job
+_by_key = {}    # key -> job id
+_lock = threading.Lock()
+
+
+def check_cancelled():
+    """Raise JobCancelled if the job running on this thread was asked to stop
+
+    For code that waits without progress to report; a no-op outside jobs.
+    """
+    job = getattr(_local, "job", None)
+    if job is not None:
+        job.check_cancelled()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.MAX_CONCURRENT_JOBS, thread_name_prefix="transcribe-job")
+    return _executor
+
+
+def _run(job, fn, args, kwargs):
+    if job.cancel_requested:
+        job.status = job.stage = "cancelled"
+        job.finished = time.time()
+        return
+    job.status = "running"
+    job.started = time.time()
+    _local.job = job
+    try:
+        with scheduler.cpu_share():
+            job.result = fn(*args, on_status=job.set_stage, on_progress=job.set_progress,
+                            on_segment=job.add_segment, on_skip=job.set_skipped, **kwargs)
+        job.status = "done"
+    except JobCancelled:
+        job.status = "cancelled"
+    except Exception as e:
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        _local.job = None
+        job.stage = job.status
+        job.finished = time.time()
+
+
+def _forget_old():
+    cutoff = time.time() - settings.JOB_RETENTION_SECONDS
+    for job_id, job in list(_jobs.items()):
+        if not job.active and job.finished and job.finished < cutoff:
+            del _jobs[job_id]
+            if _by_key.get(job.key) == job_id:
+                del _by_key[job.key]
+
+
+def submit(key, fn, *args, meta=None, **kwargs):
+    """Queue fn(*args, on_status=, on_progress=, on_segment=, on_skip=, **kwargs) unless a job for key exists
+
+    Returns the new job, or the existing one when a job with the same key is
+    still running or finished successfully. Raises QueueFull when
+    JOB_QUEUE_LIMIT jobs are already waiting.
+    """
+    with _lock:
+        _forget_old()
+        existing = _jobs.get(_by_key.get(key))
+        if existing is not None and existing.status not in ("failed", "cancelled"):
+            return existing
+        # Jobs picked up a moment from now still count as queued, so the
+        # waiting jobs are the active ones beyond the concurrency limit
+        waiting = sum(job.active for job in _jobs.values()) - settings.MAX_CONCURRENT_JOBS
+        if waiting >= settings.JOB_QUEUE_LIMIT:
+            raise QueueFull(f"{settings.JOB_QUEUE_LIMIT} jobs are already waiting")
+        job = Job(key, meta)
+        _jobs[job.id] = job
+        _by_key[key] = job.id
+        job.future = _get_executor().submit(_run, job, fn, args, kwargs)
+        return job
+
+
+def get(job_id):
+    """Return the job with the given id, or None"""
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def queue_position(job_id):
+    """Return how many queued jobs are ahead of a queued job, or None"""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job.status != "queued":
+            return None
+        return sum(other.status == "queued" and other.created < job.created for other in _jobs.values())
+
+
+def cancel(job_id):
+    """Ask a job to stop; queued jobs are dropped right away"""
+    job = get(job_id)
+    if job is None or not job.active:
+        return
+    job._cancel.set()
+    if job.future is not None and job.future.cancel():
+        job.status = job.stage = "cancelled"
+        job.finished = time.time()
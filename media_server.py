@@ -0,0 +1,225 @@
+import mimetypes
+import os
+import re
+import secrets
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import metrics
+import settings
+
+# Small HTTP endpoint that serves preview media by URL. The Streamlit page
+# only embeds a URL, and the browser fetches the video lazily with HTTP range
+# requests instead of receiving the whole file as a base64 data URI.
+# /metrics serves the telemetry totals in Prometheus text format.
+
+CHUNK_SIZE = 256 * 1024
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+_LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+_items = {}     # token -> (path, bytes or buffer reference, content type)
+_tokens = {}    # path or name -> token
+_lock = threading.Lock()
+_server = None
+
+
+def _parse_range(header, size):
+    """Return the (start, end) byte range asked for, inclusive, or None if the header is invalid"""
+    match = _RANGE.match(header.split(",")[0].strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    if match.group(1):
+        start = int(match.group(1))
+        if match.group(2) and int(match.group(2)) < start:
+            return None
+        end = int(match.group(2)) if match.group(2) else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(match.group(2)))
+        end = size - 1
+    return start, min(end, size - 1)
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            self._serve_metrics()
+            return
+        self._serve(send_body=True)
+
+    def _serve_metrics(self):
+        body = metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self, send_body):
+        token = self.path.split("?")[0].rsplit("/", 1)[-1]
+        with _lock:
+            item = _items.get(token)
+        if item is None:
+            self.send_error(404)
+            return
+        source, content_type = item
+        if isinstance(source, weakref.ref):
+            source = source()
+            if source is None:
+                self.send_error(404)
+                return
+        if not isinstance(source, str):
+            size = len(source)
+        else:
+            try:
+                size = os.path.getsize(source)
+            except OSError:
+                self.send_error(404)
+                return
+
+        byte_range = None
+        if self.headers.get("Range"):
+            # An invalid header is ignored and the whole file served
+            byte_range = _parse_range(self.headers["Range"], size)
+            if byte_range is not None and byte_range[0] >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+        start, end = byte_range or (0, size - 1)
+        length = max(0, end - start + 1)
+
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-cache")
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body or length == 0:
+            return
+
+        try:
+            if isinstance(source, bytes):
+                self.wfile.write(memoryview(source)[start:end + 1])
+                return
+            if not isinstance(source, str):
+                # A live buffer: copies only the range asked for. An edit landing
+                # mid-request can only affect a URL the page has already replaced.
+                self.wfile.write(source.read(start, end + 1))
+                return
+            with open(source, "rb") as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # The browser dropped the request, usually because it seeked
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start():
+    """Start the media server once per process and return it"""
+    global _server
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((settings.MEDIA_HOST, settings.MEDIA_PORT), MediaHandler)
+            except OSError:
+                # Port taken, e.g. by another app process; use any free port
+                _server = ThreadingHTTPServer((settings.MEDIA_HOST, 0), MediaHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="media-server", daemon=True).start()
+        return _server
+
+
+def base_url():
+    """Return the URL prefix the browser uses to reach the media server"""
+    if settings.MEDIA_URL:
+        return settings.MEDIA_URL
+    # The port actually bound, which differs from MEDIA_PORT when it was taken
+    port = start().server_address[1]
+    if settings.CODESPACE_NAME:
+        return f"https://{settings.CODESPACE_NAME}-{port}.{settings.CODESPACES_DOMAIN}"
+    return f"http://localhost:{port}"
+
+
+def reachable(browser_host):
+    """Return whether a browser that reached the app at `browser_host` can reach base_url()
+
+    Without MEDIA_URL or Codespaces the server is only known to be reachable
+    from the machine it runs on. `browser_host` is a Host header; None counts
+    as local.
+    """
+    if settings.MEDIA_URL or settings.CODESPACE_NAME or not browser_host:
+        return True
+    return urlsplit(f"//{browser_host}").hostname in _LOCAL_HOSTS
+
+
+def _publish(key, source, content_type):
+    with _lock:
+        token = _tokens.get(key)
+        if token is None:
+            token = secrets.token_urlsafe(16)
+            _tokens[key] = token
+        _items[token] = (source, content_type)
+    return f"{base_url()}/media/{token}"
+
+
+def publish_file(path, content_type=None):
+    """Serve a file and return its URL"""
+    content_type = content_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return _publish(os.path.abspath(path), path, content_type)
+
+
+def publish_bytes(name, data, content_type):
+    """Serve in-memory content under a stable name and return its URL
+
+    Publishing again under the same name replaces the content but keeps the
+    URL, so callers add a version query string to bypass browser caches.
+    """
+    return _publish(("bytes", name), bytes(data), content_type)
+
+
+def publish_buffer(name, buffer, content_type):
+    """Serve a live buffer under a stable name and return its URL
+
+    `buffer` has len() and read(start, end). It is served as it is at the
+    time of each request, so publishing again after it changes costs nothing.
+    Only a weak reference is kept: once the caller drops the buffer, e.g.
+    when its session ends, the name is unpublished.
+    """
+    key = ("bytes", name)
+
+    def forget(ref):
+        with _lock:
+            token = _tokens.get(key)
+            # Unless the name has been given a newer buffer since
+            if token is not None and _items.get(token, (None,))[0] is ref:
+                del _tokens[key]
+                del _items[token]
+
+    return _publish(key, weakref.ref(buffer, forget), content_type)
+
+
+def unpublish(path_or_name):
+    """Stop serving a file or named content"""
+    with _lock:
+        for key in (os.path.abspath(path_or_name), ("bytes", path_or_name)):
+            token = _tokens.pop(key, None)
+            if token is not None:
+                _items.pop(token, None)
@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+import numpy as np
+
+import disk_cache
+import settings
+
+# Content-addressed cache of log-mel spectrograms. Running `tiny` and then
+# `small` on the same upload needs the same features, so the first run stores
+# them as a .npy file keyed by the SHA-256 of the media bytes, the number of
+# mel bands (large-v3 uses 128, the others 80) and the padding. Later runs
+# memory-map the file read-only: nothing is recomputed or read up front, and
+# only the pages of the windows being decoded are brought in.
+
+SUFFIX = ".npy"
+BLOCK_FRAMES = 3000         # frames written at a time
+
+
+def cache_dir():
+    """Return the directory holding cached spectrograms, creating it if needed"""
+    path = os.path.join(settings.CACHE_DIR, "mel")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _entry_path(digest, n_mels, padding):
+    return os.path.join(cache_dir(), f"{digest}-{n_mels}-{padding}{SUFFIX}")
+
+
+def get(digest, n_mels, padding):
+    """Return the cached spectrogram as a read-only memory map, or None on a miss"""
+    path = _entry_path(digest, n_mels, padding)
+    try:
+        mel = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    disk_cache.touch(path)
+    return mel
+
+
+def put(digest, n_mels, padding, mel):
+    """Store a spectrogram and return it memory-mapped, or None if it exceeds the cache
+
+    `mel` is an array or tensor, or has a `shape` and a `frames(start, end)`
+    method, so the spectrogram is written a block at a time without ever
+    being held whole.
+    """
+    max_bytes = settings.MEL_CACHE_MB * 1024 * 1024
+    if mel.shape[0] * mel.shape[1] * 4 > max_bytes:
+        return None
+    directory = cache_dir()
+    path = _entry_path(digest, n_mels, padding)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=mel.shape)
+        for start in range(0, mel.shape[1], BLOCK_FRAMES):
+            end = min(start + BLOCK_FRAMES, mel.shape[1])
+            block = mel.frames(start, end) if hasattr(mel, "frames") else mel[:, start:end]
+            out[:, start:end] = np.asarray(block)
+        out.flush()
+        del out
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    disk_cache.trim(directory, max_bytes, suffixes=[SUFFIX], keep=[path])
+    return get(digest, n_mels, padding)
@@ -0,0 +1,231 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import settings
+
+# Structured telemetry. Work such as a transcription, an upload or a preview
+# encode is recorded as a run: the code doing it opens `run()`, and anything it
+# calls can time a `stage()` or `note()` a value without being handed the run,
+# because the current run is kept per thread. Finished runs are appended to a
+# JSONL file, one object per line, and added to in-process totals that
+# `prometheus_text()` renders for the media server's /metrics endpoint.
+#
+# Memory is sampled while a run is open: each record has the process RSS at
+# the start, its peak during the run and the growth between the two. The
+# process is shared by concurrent jobs, so overlapping runs see each other's
+# memory too. An exception with a `run_status` attribute, such as
+# jobs.JobCancelled, ends the run with that status instead of "error".
+
+SAMPLE_SECONDS = 0.1
+
+_local = threading.local()
+_lock = threading.Lock()
+_stage_totals = {}      # (kind, stage) -> [count, seconds]
+_run_totals = {}        # (kind, status) -> [count, seconds]
+_counters = {}          # (name, label value) -> count
+
+
+class Run:
+    def __init__(self, kind, fields):
+        self.kind = kind
+        self.fields = dict(fields)
+        self.stages = {}
+        self.started = time.perf_counter()
+        self.rss_start = self.rss_peak = rss_mb()
+        self._stopped = threading.Event()
+        if self.rss_start is not None:
+            threading.Thread(target=self._sample, name="metrics-rss", daemon=True).start()
+
+    def _sample(self):
+        while not self._stopped.wait(SAMPLE_SECONDS):
+            self.rss_peak = max(self.rss_peak, rss_mb() or 0.0)
+
+    def stop_sampling(self):
+        self._stopped.set()
+        if self.rss_start is not None:
+            self.rss_peak = max(self.rss_peak, rss_mb() or 0.0)
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def note(self, **fields):
+        self.fields.update(fields)
+
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def rss_mb():
+    """Return the current resident memory of this process in MB, or None without /proc"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * _PAGE_SIZE / (1024 * 1024)
+
+
+def peak_rss_mb():
+    """Return the lifetime peak resident memory of this process in MB"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def _write(record):
+    path = settings.METRICS_FILE
+    if not path:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One write per line, so lines from several processes do not interleave
+        with _lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError as e:
+        print(f"Could not write metrics to {path}: {e}")
+
+
+def _finish(run, status):
+    seconds = time.perf_counter() - run.started
+    run.stop_sampling()
+    memory = {}
+    if run.rss_start is not None:
+        memory = dict(
+            rss_start_mb=round(run.rss_start, 1),
+            rss_peak_mb=round(run.rss_peak, 1),
+            rss_growth_mb=round(run.rss_peak - run.rss_start, 1),
+        )
+    with _lock:
+        totals = _run_totals.setdefault((run.kind, status), [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        for name, stage_seconds in run.stages.items():
+            totals = _stage_totals.setdefault((run.kind, name), [0, 0.0])
+            totals[0] += 1
+            totals[1] += stage_seconds
+    _write(dict(
+        run.fields,
+        kind=run.kind,
+        time=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        status=status,
+        seconds=round(seconds, 4),
+        stages={name: round(value, 4) for name, value in run.stages.items()},
+        **memory,
+    ))
+
+
+@contextmanager
+def run(kind, **fields):
+    """Record the body as one run of `kind`; yields the Run"""
+    recorded = Run(kind, fields)
+    previous = getattr(_local, "run", None)
+    _local.run = recorded
+    status = "ok"
+    try:
+        yield recorded
+    except BaseException as e:
+        status = getattr(e, "run_status", "error")
+        if status == "error":
+            recorded.fields["error"] = str(e) or type(e).__name__
+        raise
+    finally:
+        _local.run = previous
+        _finish(recorded, status)
+
+
+def current():
+    """Return the run recorded on this thread, or None"""
+    return getattr(_local, "run", None)
+
+
+@contextmanager
+def stage(name):
+    """Add the time spent in the body to a stage of the current run"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current_run = current()
+        if current_run is not None:
+            current_run.add_stage(name, time.perf_counter() - started)
+
+
+def note(**fields):
+    """Attach values to the current run, if any"""
+    current_run = current()
+    if current_run is not None:
+        current_run.note(**fields)
+
+
+def count(name, label):
+    """Increment a labelled counter, e.g. count("model_loads", "hit")"""
+    with _lock:
+        _counters[(name, label)] = _counters.get((name, label), 0) + 1
+
+
+def instrument_model(model):
+    """Time a Whisper model's encoder and decoder passes into the current run"""
+    for name in ("encoder", "decoder"):
+        def before(module, args, name=name):
+            if current() is not None:
+                _local.__dict__.setdefault("module_started", {})[name] = time.perf_counter()
+
+        def after(module, args, output, name=name):
+            started = _local.__dict__.get("module_started", {}).pop(name, None)
+            current_run = current()
+            if started is not None and current_run is not None:
+                current_run.add_stage(name, time.perf_counter() - started)
+
+        getattr(model, name).register_forward_pre_hook(before)
+        getattr(model, name).register_forward_hook(after)
+    return model
+
+
+def prometheus_text():
+    """Render the totals in the Prometheus text exposition format"""
+    lines = [
+        "# HELP subgen_runs_total Finished runs by kind and status.",
+        "# TYPE subgen_runs_total counter",
+    ]
+    with _lock:
+        runs = sorted(_run_totals.items())
+        stages = sorted(_stage_totals.items())
+        counters = sorted(_counters.items())
+    for (kind, status), (total, _) in runs:
+        lines.append(f'subgen_runs_total{{kind="{kind}",status="{status}"}} {total}')
+    lines += ["# HELP subgen_run_seconds Wall time of finished runs.", "# TYPE subgen_run_seconds summary"]
+    for (kind, status), (total, seconds) in runs:
+        lines.append(f'subgen_run_seconds_sum{{kind="{kind}",status="{status}"}} {seconds:.6f}')
+        lines.append(f'subgen_run_seconds_count{{kind="{kind}",status="{status}"}} {total}')
+    lines += ["# HELP subgen_stage_seconds Time spent per stage.", "# TYPE subgen_stage_seconds summary"]
+    for (kind, name), (total, seconds) in stages:
+        lines.append(f'subgen_stage_seconds_sum{{kind="{kind}",stage="{name}"}} {seconds:.6f}')
+        lines.append(f'subgen_stage_seconds_count{{kind="{kind}",stage="{name}"}} {total}')
+    names = sorted({name for (name, _), _ in counters})
+    for name in names:
+        lines.append(f"# TYPE subgen_{name}_total counter")
+        for (counter, label), value in counters:
+            if counter == name:
+                lines.append(f'subgen_{name}_total{{result="{label}"}} {value}')
+    current_rss = rss_mb()
+    if current_rss is not None:
+        lines += [
+            "# HELP subgen_rss_megabytes Current resident memory of the process.",
+            "# TYPE subgen_rss_megabytes gauge",
+            f"subgen_rss_megabytes {current_rss:.1f}",
+        ]
+    lines += [
+        "# HELP subgen_peak_rss_megabytes Peak resident memory of the process since it started.",
+        "# TYPE subgen_peak_rss_megabytes gauge",
+        f"subgen_peak_rss_megabytes {peak_rss_mb():.1f}",
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,193 @@
+import gc
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import metrics
+import quantize
+import settings
+
+# Process-wide registry of loaded Whisper models. Streamlit imports this module
+# once per server process, so every session and every rerun shares the same
+# models instead of calling whisper.load_model() on each button click.
+# torch and whisper are imported on first use, so importing this module does
+# not slow down app or CLI startup.
+#
+# A model is shared but not reentrant: whisper's decoder installs kv-cache
+# hooks on the model's own attention layers for the length of a transcribe()
+# call, so two calls on one instance would read each other's caches.
+# Transcriptions check a model out with `using()`, which lets one run on it at
+# a time; a second job on the same model waits for the first.
+
+# Approximate parameter counts (millions) used to make room before a load.
+_PARAMS_M = {
+    "tiny": 39, "tiny.en": 39,
+    "base": 74, "base.en": 74,
+    "small": 244, "small.en": 244,
+    "medium": 769, "medium.en": 769,
+    "large": 1550, "large-v1": 1550, "large-v2": 1550, "large-v3": 1550,
+    "turbo": 809, "large-v3-turbo": 809,
+}
+
+WAIT_SECONDS = 1.0
+
+_models = OrderedDict()  # (size, device, dtype) -> (model, size in MB)
+_lock = threading.Lock()
+_key_locks = {}         # held while a model loads
+_use_locks = {}         # held while a model transcribes
+_warm_thread = None
+
+
+def default_device():
+    """Return the device models are loaded on when none is given"""
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def default_dtype(device):
+    """Return the inference precision used on a device"""
+    return "fp16" if device == "cuda" else "fp32"
+
+
+def _model_mb(model):
+    # The state dict also holds the packed weights of quantized layers, which
+    # are neither parameters nor buffers
+    total = 0
+    for value in model.state_dict().values():
+        for t in value if isinstance(value, tuple) else (value,):
+            if hasattr(t, "element_size"):
+                total += t.numel() * t.element_size()
+    return total / (1024 * 1024)
+
+
+def _estimate_mb(size):
+    return _PARAMS_M.get(size, 1550) * 4
+
+
+def _evict_for(needed_mb, keep=None):
+    """Drop least recently used models until `needed_mb` fits the budget"""
+    budget = settings.MODEL_RAM_BUDGET_MB
+    used = sum(mb for _, mb in _models.values())
+    evicted = False
+    for key in list(_models):
+        if used + needed_mb <= budget:
+            break
+        if key == keep:
+            continue
+        _, mb = _models.pop(key)
+        used -= mb
+        evicted = True
+        print(f"Evicted Whisper model {key[0]} ({key[1]}, {key[2]}) to free {mb:.0f} MB")
+    if evicted:
+        import torch
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+def _record_load(result):
+    metrics.count("model_loads", result)
+    metrics.note(model_cache=result)
+
+
+def _model_key(size, device, dtype):
+    if dtype == "int8":
+        device = "cpu"
+    device = device or default_device()
+    return size, device, dtype or default_dtype(device)
+
+
+def get_model(size, device=None, dtype=None):
+    """Return a loaded Whisper model, loading it on first use
+
+    dtype "int8" returns a dynamically quantized model, which runs on the CPU.
+    Use `using()` to run a transcription on it.
+    """
+    key = _model_key(size, device, dtype)
+    size, device, dtype = key
+
+    with _lock:
+        if key in _models:
+            _models.move_to_end(key)
+            _record_load("hit")
+            return _models[key][0]
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    # Only one thread loads a given model; others wait for it and reuse it.
+    with key_lock:
+        with _lock:
+            if key in _models:
+                _models.move_to_end(key)
+                _record_load("hit")
+                return _models[key][0]
+            _evict_for(_estimate_mb(size))
+
+        if dtype == "int8":
+            model = quantize.load_quantized(size)
+        else:
+            import whisper
+            model = whisper.load_model(size, device=device)
+        metrics.instrument_model(model)
+        _record_load("miss")
+
+        with _lock:
+            _models[key] = (model, _model_mb(model))
+            _evict_for(0, keep=key)
+        return model
+
+
+@contextmanager
+def using(size, device=None, dtype=None, on_wait=None):
+    """Check out a loaded model for one transcription; waits while another job uses it
+
+    `on_wait()` is called about every second while waiting, so a waiting job
+    can be cancelled.
+    """
+    key = _model_key(size, device, dtype)
+    with _lock:
+        use_lock = _use_locks.setdefault(key, threading.Lock())
+    while not use_lock.acquire(timeout=WAIT_SECONDS):
+        if on_wait is not None:
+            on_wait()
+    try:
+        yield get_model(*key)
+    finally:
+        use_lock.release()
+
+
+def loaded_models():
+    """Return the keys of the loaded models, least recently used first"""
+    with _lock:
+        return list(_models)
+
+
+def clear():
+    """Unload every model in the pool"""
+    with _lock:
+        _models.clear()
+    gc.collect()
+
+
+def warm_up(sizes=None, background=True):
+    """Load the configured model sizes ahead of the first transcription"""
+    global _warm_thread
+    sizes = settings.WARM_MODELS if sizes is None else sizes
+    if not sizes:
+        return None
+
+    def _load_all():
+        for size in sizes:
+            try:
+                get_model(size)
+            except Exception as e:
+                print(f"Could not warm up Whisper model {size}: {e}")
+
+    if not background:
+        _load_all()
+        return None
+
+    with _lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=_load_all, name="whisper-warm-up", daemon=True)
+            _warm_thread.start()
+        return _warm_thread
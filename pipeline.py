@@ -0,0 +1,201 @@
+import os
+import queue
+import threading
+
+import audio
+import chunked
+import jobs
+import metrics
+import model_pool
+import profiling
+import progress
+import result_cache
+import settings
+import streaming
+import vad as vad_filter
+
+# Transcription pipeline shared by the Streamlit app and the offline script.
+# Every call is recorded as a "transcribe" metrics run with per-stage timings.
+
+_DONE = object()
+
+
+def _report(on_status, stage):
+    if on_status is not None:
+        on_status(stage)
+
+
+def transcribe(media_path, model_type, task="translate", digest=None, on_status=None, on_progress=None,
+               on_segment=None, on_skip=None, workers=None, vad=None, dtype=None, profile=None, **decode_options):
+    """Return subtitle segments for a media file, reusing cached results
+
+    With more than one worker the media is transcribed in parallel chunks.
+    The audio track is decoded once to a cached 16 kHz PCM artifact that every
+    later run reads. `on_status` is called with "cached", "extracting",
+    "filtering", "loading" or "transcribing" as the pipeline moves between stages,
+    `on_progress(done_s, total_s)` with the audio decoded so far, and
+    `on_segment` with each segment as soon as its window is decoded.
+
+    With `vad` only the speech regions are transcribed, and
+    `on_skip(skipped_s, total_s)` reports how much audio was left out.
+    `dtype` "int8" runs a quantized model on the CPU. Single-worker runs
+    without VAD reuse the spectrogram of earlier runs on the same media, and
+    for recordings longer than STREAMING_MIN_SECONDS read the audio in
+    windows instead of loading it whole, see streaming.py and mel_cache.py.
+    `profile` is a path
+    prefix: the run is profiled and the results written next to it, see
+    profiling.capture().
+    """
+    workers = workers or settings.TRANSCRIBE_WORKERS
+    vad = settings.VAD if vad is None else vad
+    args = (media_path, model_type, task, digest, on_status, on_progress, on_segment, on_skip,
+            workers, vad, dtype, decode_options)
+    with metrics.run("transcribe", media=os.path.basename(media_path), model=model_type, task=task,
+                     workers=workers, dtype=dtype or "default", vad=vad, profiled=bool(profile)):
+        if not profile:
+            return _transcribe(*args)
+        with profiling.capture(profile):
+            # A cached result would leave nothing to profile
+            return _transcribe(*args, use_cache=False)
+
+
+def _transcribe(media_path, model_type, task, digest, on_status, on_progress, on_segment, on_skip,
+                workers, vad, dtype, decode_options, use_cache=True):
+    key_options = dict(decode_options)
+    if workers > 1:
+        # Chunk boundaries change the output, so chunked runs are cached apart.
+        key_options["chunk_seconds"] = settings.CHUNK_SECONDS
+    if dtype:
+        key_options["dtype"] = dtype
+    if vad:
+        key_options["vad"] = (settings.VAD_MIN_SILENCE_MS, settings.VAD_PAD_MS)
+
+    with metrics.stage("cache_lookup"):
+        digest = digest or result_cache.file_digest(media_path)
+        key = result_cache.make_key(digest, model_type, task, key_options)
+        segments = result_cache.get(key) if use_cache else None
+    metrics.note(result_cache="miss" if segments is None else "hit")
+    if segments is not None:
+        _report(on_status, "cached")
+        if on_segment is not None:
+            for segment in segments:
+                on_segment(segment)
+        return segments
+
+    _report(on_status, "extracting")
+    with metrics.stage("audio_decode"):
+        pcm = audio.extract_audio(media_path, digest)
+        seconds = os.path.getsize(pcm) // 2 / audio.SAMPLE_RATE
+        streamed = (workers == 1 and not vad and settings.STREAMING_MIN_SECONDS > 0
+                    and seconds >= settings.STREAMING_MIN_SECONDS)
+        if streamed:
+            samples = streaming.source(pcm, digest if settings.MEL_CACHE_MB > 0 else None)
+        elif workers == 1 and not vad and settings.MEL_CACHE_MB > 0:
+            # Loaded whole, but the spectrogram is shared through mel_cache
+            samples = streaming.source(pcm, digest, windowed=False)
+        else:
+            samples = audio.read_pcm(pcm)
+    metrics.note(audio_seconds=round(seconds, 2), streamed=streamed)
+
+    speech_map = None
+    if vad:
+        _report(on_status, "filtering")
+        with metrics.stage("vad"):
+            samples, speech_map = vad_filter.compact(samples)
+        metrics.note(skipped_seconds=round(speech_map.skipped_seconds, 2))
+        if on_skip is not None:
+            on_skip(speech_map.skipped_seconds, speech_map.total_seconds)
+        if on_segment is not None:
+            on_speech_segment = on_segment
+
+            def on_segment(segment):
+                # Segments are streamed on the original timeline too
+                on_speech_segment(speech_map.segment(segment))
+
+    if len(samples) == 0:
+        # Nothing but silence
+        segments = []
+    elif workers > 1:
+        _report(on_status, "loading")
+        with metrics.stage("model_load"):
+            # Waits for a worker to load the model, so load errors fail here
+            chunked.load(model_type, workers, dtype, on_wait=jobs.check_cancelled)
+        _report(on_status, "transcribing")
+        with metrics.stage("transcribe"):
+            segments = chunked.transcribe(
+                samples, model_type, workers, task=task,
+                on_progress=on_progress, on_segment=on_segment, on_wait=jobs.check_cancelled, dtype=dtype,
+                **decode_options
+            )
+    else:
+        _report(on_status, "loading")
+        with metrics.stage("model_load"):
+            model_pool.get_model(model_type, dtype=dtype)
+
+        _report(on_status, "transcribing")
+        # The model's encoder and decoder passes are timed as stages of their own
+        with metrics.stage("transcribe"), model_pool.using(model_type, dtype=dtype, on_wait=jobs.check_cancelled) as model:
+            if on_progress is not None or on_segment is not None:
+                with progress.track(on_progress, on_segment):
+                    result = model.transcribe(samples, task=task, **decode_options)
+            else:
+                result = model.transcribe(samples, task=task, **decode_options)
+
+        segments = []
+        for segment in result["segments"]:
+            segments.append({
+                'start': segment["start"],
+                'end': segment["end"],
+                'text': segment["text"].strip()
+            })
+    if speech_map is not None:
+        segments = [speech_map.segment(segment) for segment in segments]
+    metrics.note(segments=len(segments))
+    with metrics.stage("serialize"):
+        result_cache.put(key, segments)
+    return segments
+
+
+def stream(media_path, model_type, task="translate", **kwargs):
+    """Yield subtitle segments as soon as their window has been decoded
+
+    Takes the same arguments as transcribe(), which runs in a helper thread;
+    its exceptions are raised here once the segments before them are yielded.
+    If the consumer stops early or closes the generator, the transcription is
+    cancelled at its next decoded window.
+    """
+    segments = queue.Queue()
+    outcome = {}
+    stopped = threading.Event()
+
+    def checked(callback):
+        def call(*args):
+            if stopped.is_set():
+                raise jobs.JobCancelled()
+            if callback is not None:
+                callback(*args)
+        return call
+
+    kwargs['on_progress'] = checked(kwargs.get('on_progress'))
+
+    def run():
+        try:
+            transcribe(media_path, model_type, task=task, on_segment=checked(segments.put), **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            segments.put(_DONE)
+
+    worker = threading.Thread(target=run, name="transcribe-stream", daemon=True)
+    worker.start()
+    try:
+        while True:
+            segment = segments.get()
+            if segment is _DONE:
+                break
+            yield segment
+    finally:
+        stopped.set()
+    worker.join()
+    if 'error' in outcome:
+        raise outcome['error']
@@ -0,0 +1,113 @@
+import mimetypes
+import os
+import threading
+
+import ffmpeg
+
+import disk_cache
+import metrics
+import settings
+
+# Low-bitrate proxies for the preview player. The player only needs to show
+# subtitle timing, so a background ffmpeg job encodes a small H.264/AAC copy
+# of each upload, cached by content hash. Until it is ready the player falls
+# back to the original file, and for good if the encode fails: a failed digest
+# is not retried on every rerun of the page.
+
+_jobs = {}  # digest -> running thread
+_failed = set()  # digests whose encode failed, in this process
+_lock = threading.Lock()
+
+
+def cache_dir():
+    """Return the directory holding preview proxies, creating it if needed"""
+    path = os.path.join(settings.CACHE_DIR, "previews")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _proxy_file(digest):
+    return os.path.join(cache_dir(), f"{digest}.mp4")
+
+
+def needs_proxy(media_path):
+    """Return True for video files; audio uploads are played as they are"""
+    media_type = mimetypes.guess_type(media_path)[0] or ""
+    return media_type.startswith("video")
+
+
+def _encode(media_path, digest):
+    with metrics.run("preview", media=os.path.basename(media_path)):
+        _encode_proxy(media_path, digest)
+
+
+def _encode_proxy(media_path, digest):
+    path = _proxy_file(digest)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    ok = False
+    try:
+        (
+            ffmpeg.input(media_path)
+            .output(
+                tmp_path,
+                format="mp4",
+                vf=f"scale=-2:'min({settings.PREVIEW_HEIGHT},ih)'",
+                vcodec="libx264",
+                preset="veryfast",
+                crf=30,
+                pix_fmt="yuv420p",
+                acodec="aac",
+                audio_bitrate="64k",
+                movflags="+faststart",
+                threads=settings.PREVIEW_THREADS,
+            )
+            .overwrite_output()
+            .run(cmd="ffmpeg", capture_stdout=True, capture_stderr=True)
+        )
+        os.replace(tmp_path, path)
+        disk_cache.trim(cache_dir(), settings.PREVIEW_CACHE_MB * 1024 * 1024, suffixes=[".mp4"], keep=[path])
+        ok = True
+    except ffmpeg.Error as e:
+        metrics.note(error="ffmpeg failed")
+        print(f"Preview proxy failed for {media_path}: {e.stderr.decode(errors='replace')[-500:]}")
+    except OSError as e:
+        # ffmpeg missing, or the cache directory not writable
+        metrics.note(error=str(e))
+        print(f"Preview proxy failed for {media_path}: {e}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with _lock:
+            _jobs.pop(digest, None)
+            if not ok:
+                _failed.add(digest)
+
+
+def start_proxy(media_path, digest):
+    """Start encoding the preview proxy in the background if it is missing
+
+    Media whose encode failed before is not tried again.
+    """
+    if not needs_proxy(media_path) or proxy_path(digest):
+        return
+    with _lock:
+        if digest in _jobs or digest in _failed:
+            return
+        job = threading.Thread(target=_encode, args=(media_path, digest), name=f"preview-{digest[:8]}", daemon=True)
+        _jobs[digest] = job
+    job.start()
+
+
+def proxy_path(digest):
+    """Return the finished proxy for a content hash, or None"""
+    path = _proxy_file(digest)
+    if os.path.exists(path):
+        disk_cache.touch(path)
+        return path
+    return None
+
+
+def is_encoding(digest):
+    """Return True while the proxy for a content hash is being encoded"""
+    with _lock:
+        return digest in _jobs
@@ -0,0 +1,74 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+# On-demand profiling of one transcription. cProfile sees the Python side
+# (ffmpeg waits, mel computation, decoding loop, caches) and the torch
+# profiler the operators underneath (encoder, decoder, beam search). Both
+# profile the thread that runs the body; chunk worker processes are not
+# covered. Every file written starts with the given prefix:
+#
+#   .pstats          cProfile data, for snakeviz or flameprof
+#   .stacks.txt      torch operator stacks in collapsed format, for
+#                    flamegraph.pl or speedscope
+#   .trace.json      torch Chrome trace, for Perfetto or chrome://tracing
+#   .hotspots.txt    the top functions and operators as plain text
+
+TOP_N = 30
+
+
+def _hotspots(python_profile, torch_profile, elapsed, top):
+    out = io.StringIO()
+    out.write(f"Wall time: {elapsed:.2f} s\n\n")
+    for sort in ("cumulative", "tottime"):
+        out.write(f"=== Python functions by {sort} time ===\n")
+        pstats.Stats(python_profile, stream=out).sort_stats(sort).print_stats(top)
+    if torch_profile is not None:
+        out.write("=== torch operators by self CPU time ===\n")
+        out.write(torch_profile.key_averages().table(sort_by="self_cpu_time_total", row_limit=top))
+        out.write("\n")
+    return out.getvalue()
+
+
+@contextmanager
+def capture(prefix, top=TOP_N):
+    """Profile the body and write the results next to `prefix`; yields the list of files written"""
+    os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+    try:
+        import torch
+        from torch.profiler import ProfilerActivity, profile
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        torch_profile = profile(activities=activities, with_stack=True)
+    except ImportError:
+        torch_profile = None
+
+    files = []
+    python_profile = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        if torch_profile is not None:
+            torch_profile.__enter__()
+        python_profile.enable()
+        try:
+            yield files
+        finally:
+            python_profile.disable()
+            if torch_profile is not None:
+                torch_profile.__exit__(None, None, None)
+    finally:
+        # Written even when the run fails, which is often when a profile is wanted
+        elapsed = time.perf_counter() - started
+        python_profile.dump_stats(prefix + ".pstats")
+        files.append(prefix + ".pstats")
+        if torch_profile is not None:
+            torch_profile.export_stacks(prefix + ".stacks.txt", "self_cpu_time_total")
+            torch_profile.export_chrome_trace(prefix + ".trace.json")
+            files += [prefix + ".stacks.txt", prefix + ".trace.json"]
+        with open(prefix + ".hotspots.txt", "w", encoding="utf-8") as f:
+            f.write(_hotspots(python_profile, torch_profile, elapsed, top))
+        files.append(prefix + ".hotspots.txt")
@@ -0,0 +1,100 @@
+import importlib
+import sys
+import threading
+from contextlib import contextmanager
+
+import tqdm as _tqdm
+
+# Decoder progress reporting. whisper's transcribe() advances a tqdm bar by the
+# number of mel frames it has decoded after every 30-second window. The bar is
+# replaced with one that, inside `track()`, hands the audio offset of the last
+# decoded window to a callback instead of drawing on the console. Outside
+# `track()` it behaves like the normal tqdm bar.
+#
+# The same hook streams segments: when the bar is advanced, the segments of
+# the finished window have just been appended to transcribe()'s
+# `all_segments` list, so the new ones are read from the caller's frame.
+#
+# The patch is installed by the first `track()` call, so importing this module
+# does not import whisper.
+
+SECONDS_PER_FRAME = None    # mel frame length, set when the patch is installed
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+
+
+class ProgressBar:
+    def __init__(self, *args, **kwargs):
+        self._callback = getattr(_local, "callback", None)
+        self._on_segment = getattr(_local, "on_segment", None)
+        self._total = kwargs.get("total") or 0
+        self._done = 0
+        self._emitted = 0
+        tracked = self._callback or self._on_segment
+        self._bar = None if tracked else _tqdm.tqdm(*args, **kwargs)
+
+    def update(self, n=1):
+        self._done += n
+        if self._on_segment is not None:
+            self._emit_segments(sys._getframe(1).f_locals.get("all_segments") or [])
+        if self._bar is not None:
+            self._bar.update(n)
+        elif self._callback is not None:
+            self._callback(self._done * SECONDS_PER_FRAME, self._total * SECONDS_PER_FRAME)
+
+    def _emit_segments(self, all_segments):
+        for segment in all_segments[self._emitted:]:
+            self._on_segment({
+                'start': segment["start"],
+                'end': segment["end"],
+                'text': segment["text"].strip()
+            })
+        self._emitted = len(all_segments)
+
+    def close(self):
+        if self._bar is not None:
+            self._bar.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class _TqdmModule:
+    # Stands in for the tqdm module inside whisper.transcribe
+    tqdm = ProgressBar
+
+
+def _install():
+    global SECONDS_PER_FRAME, _installed
+    with _install_lock:
+        if _installed:
+            return
+        import whisper
+        SECONDS_PER_FRAME = whisper.audio.HOP_LENGTH / whisper.audio.SAMPLE_RATE
+        # whisper.transcribe is shadowed by the function of the same name
+        importlib.import_module("whisper.transcribe").tqdm = _TqdmModule
+        _installed = True
+
+
+@contextmanager
+def track(callback=None, on_segment=None):
+    """Send decoder progress of this thread to callback(done_s, total_s)
+
+    `on_segment` receives every new segment once its window is decoded. The
+    callbacks may raise to abort the transcription after the current window,
+    which is how background jobs are cancelled.
+    """
+    _install()
+    previous = (getattr(_local, "callback", None), getattr(_local, "on_segment", None))
+    _local.callback = callback
+    _local.on_segment = on_segment
+    try:
+        yield
+    finally:
+        _local.callback, _local.on_segment = previous
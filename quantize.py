@@ -0,0 +1,65 @@
+import os
+import tempfile
+import threading
+
+import settings
+
+# int8 CPU inference. The Linear layers of a Whisper model, which hold most of
+# its weights and compute, are replaced with dynamically quantized ones: int8
+# weights, activations quantized on the fly. Converting takes a while, so the
+# quantized model is saved under the cache directory after the first run and
+# loaded from there afterwards.
+
+_lock = threading.Lock()
+
+
+def cache_dir():
+    return os.path.join(settings.CACHE_DIR, "models")
+
+
+def cache_path(size):
+    """Return where the quantized model of a size is stored"""
+    import torch
+    # Pickled modules only load back into the torch version that wrote them
+    return os.path.join(cache_dir(), f"{size}-int8-torch{torch.__version__.split('+')[0]}.pt")
+
+
+def quantize_model(model):
+    """Quantize the Linear layers of a CPU Whisper model to int8, in place"""
+    import torch
+    # whisper uses a Linear subclass only to cast weights to the input dtype,
+    # which is a no-op in fp32. quantize_dynamic matches exact classes, so the
+    # layers are turned back into plain nn.Linear first.
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_quantized(size):
+    """Return an int8 Whisper model, converting and caching it on first use"""
+    import torch
+    import whisper
+    path = cache_path(size)
+    with _lock:
+        if os.path.exists(path):
+            try:
+                model = torch.load(path, map_location="cpu", weights_only=False)
+                model.eval()
+                return model
+            except Exception as e:
+                print(f"Could not load quantized model {path}, converting again: {e}")
+
+        model = quantize_model(whisper.load_model(size, device="cpu"))
+        model.eval()
+        os.makedirs(cache_dir(), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir(), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                torch.save(model, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not cache quantized model {size}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return model
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import disk_cache
+import settings
+
+# Content-addressed cache of transcription results. Entries are keyed by the
+# SHA-256 of the media bytes plus the model size, task and decode options, and
+# hold the segment list generate_subtitles returns, stored as JSON.
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def cache_dir():
+    """Return the directory holding cached results, creating it if needed"""
+    path = os.path.join(settings.CACHE_DIR, "results")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_key(digest, model_type, task, options=None):
+    """Build the cache key for one media file and transcription setup"""
+    spec = json.dumps(
+        {"media": digest, "model": model_type, "task": task, "options": options or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(cache_dir(), f"{key}.json")
+
+
+def get(key):
+    """Return the cached segments for a key, or None on a miss"""
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            segments = json.load(f)
+    except (OSError, ValueError):
+        return None
+    disk_cache.touch(path)
+    return segments
+
+
+def put(key, segments):
+    """Store the segments for a key and trim the cache to its size limit"""
+    directory = cache_dir()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(segments, f)
+        os.replace(tmp_path, _entry_path(key))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    disk_cache.trim(directory, settings.RESULT_CACHE_MB * 1024 * 1024, suffixes=[".json"])
+
@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+import settings
+
+# CPU scheduling for transcription jobs running side by side in one process.
+# Left alone, every job's torch would use all cores and the jobs would slow
+# each other down. Instead each running job gets an equal share of the cores
+# as its intra-op thread count, which torch keeps per calling thread, and
+# optionally has its thread pinned to its own block of cores. Shares are
+# recomputed whenever a job starts or finishes; running jobs pick up their new
+# share at their next stage change or decoded window.
+
+_CORES = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+
+_lock = threading.Lock()
+_active = []    # one token per running job, in start order
+_local = threading.local()
+
+
+def _apply():
+    with _lock:
+        rank = _active.index(_local.token)
+        count = len(_active)
+    if _local.applied == (rank, count):
+        return
+    threads = share()
+    if settings.PIN_CORES and hasattr(os, "sched_setaffinity"):
+        cores = _CORES[rank * threads:(rank + 1) * threads] or _CORES
+        # Threads torch starts from here on inherit the mask
+        os.sched_setaffinity(0, cores)
+    # Only once a model has been loaded; cached results never need torch
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    torch.set_num_threads(threads)
+    _local.applied = (rank, count)
+
+
+@contextmanager
+def cpu_share():
+    """Run the body as one of the jobs sharing the CPU"""
+    token = object()
+    with _lock:
+        _active.append(token)
+    _local.token = token
+    _local.applied = None
+    try:
+        _apply()
+        yield
+    finally:
+        with _lock:
+            _active.remove(token)
+        _local.token = None
+        if settings.PIN_CORES and hasattr(os, "sched_setaffinity"):
+            # The job thread is reused for the next job
+            os.sched_setaffinity(0, _CORES)
+
+
+def share():
+    """Return the number of cores the calling job may use; all of them outside jobs"""
+    token = getattr(_local, "token", None)
+    with _lock:
+        count = len(_active) if token in _active else 1
+    return max(1, len(_CORES) // count)
+
+
+def rebalance():
+    """Apply the calling job's current share of the cores if it changed"""
+    if getattr(_local, "token", None) is not None:
+        _apply()
@@ -0,0 +1,98 @@
+import os
+
+# Runtime settings shared by the Streamlit app (subtitles.py) and the offline
+# script (Offline.py). Every value can be overridden with an environment
+# variable so the same code runs on a laptop and on the processing box.
+
+
+def _env_int(name, default):
+    value = os.environ.get(name, "").strip()
+    return int(value) if value else default
+
+
+def _env_list(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# Whisper model pool: total RAM (in MB) the loaded models may use before the
+# least recently used one is evicted, and the sizes the app loads in the
+# background once its first page is drawn. None by default, so torch and
+# whisper are only imported when a transcription starts.
+MODEL_RAM_BUDGET_MB = _env_int("SUBGEN_MODEL_RAM_MB", 4096)
+WARM_MODELS = _env_list("SUBGEN_WARM_MODELS", [])
+
+# On-disk cache shared by the app and the offline script. Each cache lives in
+# its own sub-directory and is trimmed to its size limit (in MB).
+CACHE_DIR = os.environ.get("SUBGEN_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "subgen")
+RESULT_CACHE_MB = _env_int("SUBGEN_RESULT_CACHE_MB", 256)
+# Extracted 16 kHz audio, about 115 MB per media hour
+AUDIO_CACHE_MB = _env_int("SUBGEN_AUDIO_CACHE_MB", 4096)
+
+# Parallel transcription: number of worker processes (1 transcribes in-process
+# without chunking) and the target chunk length in seconds. Chunks are cut at
+# the quietest point within CHUNK_SEARCH_SECONDS of each target boundary.
+TRANSCRIBE_WORKERS = _env_int("SUBGEN_WORKERS", 1)
+CHUNK_SECONDS = _env_int("SUBGEN_CHUNK_SECONDS", 300)
+CHUNK_SEARCH_SECONDS = _env_int("SUBGEN_CHUNK_SEARCH_SECONDS", 15)
+
+# Local media endpoint for the preview player. MEDIA_URL is the address the
+# browser uses to reach it; leave it empty to use http://localhost:<port>, or
+# the forwarded port's address when running in GitHub Codespaces. Browsers on
+# any other host get the player through Streamlit's own media endpoint.
+MEDIA_HOST = os.environ.get("SUBGEN_MEDIA_HOST", "127.0.0.1")
+MEDIA_PORT = _env_int("SUBGEN_MEDIA_PORT", 8502)
+MEDIA_URL = os.environ.get("SUBGEN_MEDIA_URL", "").rstrip("/")
+CODESPACE_NAME = os.environ.get("CODESPACE_NAME")
+CODESPACES_DOMAIN = os.environ.get("GITHUB_CODESPACES_PORT_FORWARDING_DOMAIN", "app.github.dev")
+
+# Low-bitrate proxy for the preview player: enabled by default, encoded at
+# PREVIEW_HEIGHT lines with PREVIEW_THREADS ffmpeg threads, and cached per
+# content hash up to PREVIEW_CACHE_MB.
+PREVIEW_PROXY = _env_int("SUBGEN_PREVIEW_PROXY", 1) == 1
+PREVIEW_HEIGHT = _env_int("SUBGEN_PREVIEW_HEIGHT", 360)
+PREVIEW_THREADS = _env_int("SUBGEN_PREVIEW_THREADS", 2)
+PREVIEW_CACHE_MB = _env_int("SUBGEN_PREVIEW_CACHE_MB", 2048)
+
+# Content-addressed store for uploaded media, trimmed least recently used
+# first to UPLOAD_QUOTA_MB.
+UPLOAD_DIR = os.environ.get("SUBGEN_UPLOAD_DIR") or os.path.join(CACHE_DIR, "uploads")
+UPLOAD_QUOTA_MB = _env_int("SUBGEN_UPLOAD_QUOTA_MB", 10240)
+
+# Background transcription jobs: how many run at once (sharing the CPU cores
+# between them, optionally pinned to separate cores), how many may wait behind
+# them before new ones are turned away, and how long finished jobs stay
+# available for a refreshed page to reattach. SUBGEN_JOB_WORKERS is the
+# older name of SUBGEN_MAX_CONCURRENT_JOBS.
+MAX_CONCURRENT_JOBS = _env_int("SUBGEN_MAX_CONCURRENT_JOBS", _env_int("SUBGEN_JOB_WORKERS", 2))
+JOB_QUEUE_LIMIT = _env_int("SUBGEN_JOB_QUEUE_LIMIT", 8)
+PIN_CORES = _env_int("SUBGEN_PIN_CORES", 0) == 1
+JOB_RETENTION_SECONDS = _env_int("SUBGEN_JOB_RETENTION_SECONDS", 3600)
+
+# Voice activity detection before transcription: off by default. Pauses
+# shorter than VAD_MIN_SILENCE_MS stay in, and every speech region is padded
+# by VAD_PAD_MS on both sides.
+VAD = _env_int("SUBGEN_VAD", 0) == 1
+VAD_MIN_SILENCE_MS = _env_int("SUBGEN_VAD_MIN_SILENCE_MS", 1000)
+VAD_PAD_MS = _env_int("SUBGEN_VAD_PAD_MS", 200)
+
+# Recordings at least this long are decoded window by window straight from the
+# extracted PCM file, so memory no longer grows with their length. Applies to
+# single-worker runs without VAD. Off (0) by default; 1800 is a sensible value
+# where long recordings run out of memory.
+STREAMING_MIN_SECONDS = _env_int("SUBGEN_STREAMING_MIN_SECONDS", 0)
+
+# Log-mel spectrograms of single-worker runs without VAD, kept per content hash
+# as memory-mapped files up to MEL_CACHE_MB (0 turns the cache off) so re-runs
+# with another model or task skip the feature computation.
+MEL_CACHE_MB = _env_int("SUBGEN_MEL_CACHE_MB", 2048)
+
+# Structured telemetry: one JSON object per finished transcription, upload or
+# preview encode is appended to METRICS_FILE (set it empty to turn this off).
+# Totals are also served in Prometheus format at <media server>/metrics.
+METRICS_FILE = os.environ.get("SUBGEN_METRICS_FILE", os.path.join(CACHE_DIR, "metrics.jsonl"))
+
+# Profiles captured from the app's sidebar toggle are written here.
+PROFILE_DIR = os.environ.get("SUBGEN_PROFILE_DIR") or os.path.join(CACHE_DIR, "profiles")
@@ -0,0 +1,188 @@
+import importlib
+import os
+import threading
+
+import numpy as np
+
+import mel_cache
+import metrics
+import settings
+
+# Bounded-memory decoding for very long recordings. whisper's transcribe()
+# turns the whole waveform into one log-mel spectrogram before decoding, which
+# for a 10-hour file means gigabytes of float32 audio and features. Here the
+# audio stays in the extracted PCM file and transcribe() is handed a
+# spectrogram that computes only the 30-second window it asks for, reading just
+# the samples that window needs. Memory stays the same whatever the duration.
+#
+# The frames match whisper's own: each window is read with the STFT's half
+# window of context on either side (reflected at the start, zeros past the
+# end, as in the padded full signal), and the dynamic range is clamped against
+# the maximum of the whole spectrogram, found in a first streaming pass.
+#
+# When the source carries the media's content hash, the spectrogram is also
+# written to mel_cache on the first run and memory-mapped on later ones. Shorter
+# recordings go through the cache too: their spectrogram is computed whole by
+# whisper itself, as for samples in memory, and only stored.
+
+BLOCK_FRAMES = 3000         # frames computed at a time in the first pass
+
+_install_lock = threading.Lock()
+_installed = False
+
+
+class PcmSource:
+    """16 kHz mono 16-bit PCM file read in windows"""
+
+    def __init__(self, path, digest=None, windowed=True):
+        self.path = path
+        self.digest = digest
+        self.windowed = windowed
+        self.samples = os.path.getsize(path) // 2
+        # Mapped once: stays readable even if the audio cache trims the file
+        self._data = np.memmap(path, dtype=np.int16, mode="r") if self.samples else None
+
+    def __len__(self):
+        return self.samples
+
+    def read(self, start, end):
+        """Return samples [start, end) as float32, reflected before 0 and zero after the end"""
+        out = np.zeros(end - start, dtype=np.float32)
+        lo, hi = max(start, 0), min(end, self.samples)
+        if hi > lo:
+            out[lo - start:hi - start] = self._data[lo:hi].astype(np.float32) / 32768.0
+        if start < 0:
+            # Reflect padding, as torch.stft(center=True) does: sample -k is sample k
+            reflected = self.read(1, 1 - start)
+            out[:-start] = reflected[::-1]
+        return out
+
+
+class _Spectrogram:
+    """Stands in for the log-mel spectrogram transcribe() slices window by window"""
+
+    shape = (0, 0)
+
+    def frames(self, start, end):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        rows, cols = key
+        if rows != slice(None) or not isinstance(cols, slice) or cols.step not in (None, 1):
+            raise IndexError("only mel[:, start:end] is supported")
+        return self.frames(cols.start or 0, self.shape[1] if cols.stop is None else cols.stop)
+
+    def take(self, indices, axis=-1):
+        # pad_or_trim() on the whole spectrogram, for language detection
+        return self.frames(indices.start, indices.stop)
+
+    def to(self, *args, **kwargs):
+        # pad_or_trim() hands back the spectrogram itself when it is exactly
+        # one window long (under 160 samples of audio), and transcribe() then
+        # moves it to the model's device
+        return self.frames(0, self.shape[1]).to(*args, **kwargs)
+
+
+class LazyMel(_Spectrogram):
+    """Spectrogram computed from a PcmSource one window at a time"""
+
+    def __init__(self, source, n_mels, padding):
+        import torch
+        from whisper.audio import HOP_LENGTH, N_FFT, mel_filters
+        self._torch = torch
+        self._source = source
+        self._hop = HOP_LENGTH
+        self._n_fft = N_FFT
+        self._window = torch.hann_window(N_FFT)
+        self._filters = mel_filters("cpu", n_mels)
+        # Frames of the padded signal, less the last one, as whisper computes them
+        self.shape = (n_mels, (source.samples + padding) // HOP_LENGTH)
+        self._floor = self._max() - 8.0
+
+    def _log_mel(self, start, end):
+        torch = self._torch
+        half = self._n_fft // 2
+        samples = self._source.read(start * self._hop - half, (end - 1) * self._hop + half)
+        stft = torch.stft(torch.from_numpy(samples), self._n_fft, self._hop, window=self._window,
+                          center=False, return_complex=True)
+        mel = self._filters @ (stft.abs() ** 2)
+        return torch.clamp(mel, min=1e-10).log10()
+
+    def _max(self):
+        peak = float("-inf")
+        for start in range(0, self.shape[1], BLOCK_FRAMES):
+            end = min(start + BLOCK_FRAMES, self.shape[1])
+            peak = max(peak, float(self._log_mel(start, end).max()))
+        return peak
+
+    def frames(self, start, end):
+        """Return log-mel frames [start, end) normalized as whisper does"""
+        start, end = max(start, 0), min(end, self.shape[1])
+        if end <= start:
+            return self._torch.zeros(self.shape[0], 0)
+        log_spec = self._torch.clamp(self._log_mel(start, end), min=self._floor)
+        return (log_spec + 4.0) / 4.0
+
+
+class MappedMel(_Spectrogram):
+    """Spectrogram read from a memory-mapped mel_cache entry"""
+
+    def __init__(self, array):
+        import torch
+        self._torch = torch
+        self._array = array
+        self.shape = array.shape
+
+    def frames(self, start, end):
+        # Copies just this window out of the read-only mapping
+        return self._torch.from_numpy(np.array(self._array[:, max(start, 0):end]))
+
+
+def _spectrogram(source, n_mels, padding, whole):
+    # `whole` is whisper's own log_mel_spectrogram()
+    if not source.digest or settings.MEL_CACHE_MB <= 0:
+        if source.windowed:
+            return LazyMel(source, n_mels, padding)
+        return whole(source.read(0, source.samples), n_mels, padding)
+    cached = mel_cache.get(source.digest, n_mels, padding)
+    metrics.note(mel_cache="miss" if cached is None else "hit")
+    if cached is None:
+        with metrics.stage("mel"):
+            if source.windowed:
+                mel = LazyMel(source, n_mels, padding)
+            else:
+                mel = whole(source.read(0, source.samples), n_mels, padding)
+            cached = mel_cache.put(source.digest, n_mels, padding, mel)
+        if cached is None or not source.windowed:
+            # Too large for the cache, or already in memory
+            return mel
+    return MappedMel(cached)
+
+
+def _install():
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        # whisper.transcribe is shadowed by the function of the same name
+        module = importlib.import_module("whisper.transcribe")
+        original = module.log_mel_spectrogram
+
+        def log_mel_spectrogram(source, n_mels=80, padding=0, device=None):
+            if isinstance(source, PcmSource):
+                return _spectrogram(source, n_mels, padding, original)
+            return original(source, n_mels, padding, device)
+
+        module.log_mel_spectrogram = log_mel_spectrogram
+        _installed = True
+
+
+def source(pcm_path, digest=None, windowed=True):
+    """Return extracted PCM audio for model.transcribe() to decode in windows
+
+    With the media's content hash the spectrogram goes through mel_cache.
+    With `windowed` False the audio and spectrogram are loaded whole, exactly
+    as for samples in memory, and the source only serves to reach the cache.
+    """
+    _install()
+    return PcmSource(pcm_path, digest, windowed)
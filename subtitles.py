@@ -1,11 +1,22 @@
 import streamlit as st
-import whisper
 import os
-import tempfile
 import time
-import json
-import base64
+import uuid
+import html
+from bisect import bisect_left
+from cue_index import CueIndex
+from vtt_buffer import VttBuffer
+import formats
+import jobs
+import mimetypes
 import warnings
+import media_server
+import metrics
+import model_pool
+import pipeline
+import preview
+import settings
+import uploads
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
 
 # Configure Streamlit page
@@ -347,8 +358,14 @@ st.markdown('<link href="https://fonts.googleapis.com/css2?family=Inter:wght@300
 # Initialize session state
 if 'subtitles' not in st.session_state:
     st.session_state.subtitles = None
+if 'cue_index' not in st.session_state:
+    st.session_state.cue_index = None
+if 'vtt_buffer' not in st.session_state:
+    st.session_state.vtt_buffer = None
 if 'video_path' not in st.session_state:
     st.session_state.video_path = None
+if 'timeline_page' not in st.session_state:
+    st.session_state.timeline_page = 1
 if 'processing' not in st.session_state:
     st.session_state.processing = False
 if 'current_subtitle' not in st.session_state:
@@ -357,93 +374,315 @@ if 'font_size' not in st.session_state:
     st.session_state.font_size = 1.8
 if 'position' not in st.session_state:
     st.session_state.position = "Bottom (Default)"
-if 'video_base64' not in st.session_state:
-    st.session_state.video_base64 = None
-if 'vtt_base64' not in st.session_state:
-    st.session_state.vtt_base64 = None
-
-def format_timestamp(seconds):
-    """Convert seconds to VTT timestamp format"""
-    milliseconds = int((seconds - int(seconds)) * 1000)
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = int(seconds % 60)
-    return f"{hours:02}:{minutes:02}:{seconds:02}.{milliseconds:03}"
-
-def generate_subtitles(video_path, model_type):
-    """Generate subtitles using Whisper"""
-    try:
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        status_text.markdown(
-            f'<div class="glass card"><div class="card-header"><span class="icon">⏳</span>Loading Whisper model...</div></div>',
-            unsafe_allow_html=True
-        )
-        progress_bar.progress(20)
-        model = whisper.load_model(model_type)
-        
-        status_text.markdown(
-            f'<div class="glass card"><div class="card-header"><span class="icon">🎙️</span>Transcribing video...</div></div>',
-            unsafe_allow_html=True
-        )
-        progress_bar.progress(40)
-        result = model.transcribe(video_path, task="translate")
-        
-        status_text.markdown(
-            f'<div class="glass card"><div class="card-header"><span class="icon">✍️</span>Processing subtitles...</div></div>',
-            unsafe_allow_html=True
-        )
-        progress_bar.progress(80)
-        
-        # Format subtitles for display
-        subtitles = []
-        for segment in result["segments"]:
-            subtitles.append({
-                'start': segment["start"],
-                'end': segment["end"],
-                'text': segment["text"].strip()
-            })
-        
-        progress_bar.progress(100)
-        status_text.markdown(
-            f'<div class="glass card"><div class="card-header"><span class="icon">✅</span>Subtitles generated successfully!</div></div>',
-            unsafe_allow_html=True
+if 'video_url' not in st.session_state:
+    st.session_state.video_url = None
+if 'vtt_url' not in st.session_state:
+    st.session_state.vtt_url = None
+if 'vtt_version' not in st.session_state:
+    st.session_state.vtt_version = 0
+if 'vtt_name' not in st.session_state:
+    # The subtitle track is published per session: the same video opened in
+    # two sessions must not share one URL, or each would see the other's edits
+    st.session_state.vtt_name = f"{uuid.uuid4().hex}.vtt"
+if 'exports' not in st.session_state:
+    st.session_state.exports = {}
+if 'video_digest' not in st.session_state:
+    st.session_state.video_digest = None
+if 'video_name' not in st.session_state:
+    st.session_state.video_name = None
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = None
+if 'job_message' not in st.session_state:
+    st.session_state.job_message = None
+if 'job_notice' not in st.session_state:
+    st.session_state.job_notice = None
+
+# After a browser refresh, reattach to the job named in the URL instead of starting over
+if st.session_state.job_id is None and st.query_params.get("job"):
+    reattached_job = jobs.get(st.query_params["job"])
+    if reattached_job is not None:
+        st.session_state.job_id = reattached_job.id
+        st.session_state.processing = True
+        st.session_state.video_path = reattached_job.meta['video_path']
+        st.session_state.video_digest = reattached_job.meta['digest']
+        st.session_state.video_name = reattached_job.meta['name']
+    else:
+        del st.query_params["job"]
+
+JOB_STAGES = {
+    "queued": ("🕒", "Waiting for a free worker..."),
+    "cached": ("⚡", "Loading cached subtitles..."),
+    "extracting": ("🎧", "Extracting audio..."),
+    "filtering": ("🔇", "Skipping silence..."),
+    "loading": ("⏳", "Loading Whisper model..."),
+    "transcribing": ("🎙️", "Transcribing video..."),
+}
+
+def format_duration(seconds):
+    """Format seconds as M:SS, or H:MM:SS from one hour up"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+def generate_subtitles(video_path, model_type, workers=1, digest=None, name=None, vad=False, dtype=None, profile=False):
+    """Start generating subtitles with Whisper in the background and return the job"""
+    profile_prefix = None
+    if profile:
+        base_name = os.path.splitext(name or os.path.basename(video_path))[0]
+        profile_prefix = os.path.join(settings.PROFILE_DIR, f"{base_name}-{time.strftime('%Y%m%d-%H%M%S')}")
+    # A profiled run is never merged with another job
+    key = (digest or video_path, model_type, "translate", workers, vad, dtype, profile_prefix)
+    meta = {'video_path': video_path, 'digest': digest, 'name': name, 'profile': profile_prefix}
+    return jobs.submit(
+        key, pipeline.transcribe, video_path, model_type,
+        task="translate", digest=digest, workers=workers, vad=vad, dtype=dtype, profile=profile_prefix, meta=meta
+    )
+
+def finish_job(job):
+    """Move a finished job's outcome into the session"""
+    st.session_state.job_id = None
+    st.session_state.processing = False
+    if "job" in st.query_params:
+        del st.query_params["job"]
+    
+    if job.status == "done":
+        # Finished jobs are shared by every session that submits the same
+        # key, and edits change the segments in place, so each gets a copy
+        subtitles = [dict(segment) for segment in job.result]
+        st.session_state.subtitles = subtitles
+        # timeline_page belongs to a widget that may already be on the page,
+        # so show_timeline() resets it before drawing the widget
+        st.session_state.reset_timeline = True
+        notices = []
+        if job.audio_skipped:
+            notices.append(f"Skipped {format_duration(job.audio_skipped)} of silence before transcribing.")
+        if job.meta.get('profile'):
+            notices.append(f"Profile saved to {job.meta['profile']}.hotspots.txt (and .pstats, .stacks.txt, .trace.json).")
+        st.session_state.job_notice = " ".join(notices) or None
+        # Serve video and subtitles to the player by URL
+        try:
+            with metrics.run("player", media=job.meta['name'], segments=len(subtitles)):
+                with metrics.stage("index"):
+                    st.session_state.cue_index = CueIndex(subtitles)
+                with metrics.stage("serialize"):
+                    st.session_state.vtt_buffer = VttBuffer(subtitles)
+                with metrics.stage("publish"):
+                    st.session_state.video_url = media_server.publish_file(job.meta['video_path'])
+                    st.session_state.vtt_url = publish_vtt(st.session_state.vtt_buffer)
+        except Exception as e:
+            st.session_state.job_message = f"Error preparing video: {str(e)}"
+    elif job.status == "failed":
+        st.session_state.job_message = f"Error generating subtitles: {job.error}"
+    else:
+        st.session_state.job_message = "Subtitle generation was cancelled."
+
+@st.fragment(run_every=1.0)
+def show_job_status():
+    """Poll the background job and render its progress"""
+    job = jobs.get(st.session_state.job_id)
+    if job is None or not job.active:
+        if job is not None:
+            finish_job(job)
+        else:
+            st.session_state.job_id = None
+            st.session_state.processing = False
+        st.rerun()
+    
+    icon, message = JOB_STAGES.get(job.stage, JOB_STAGES["transcribing"])
+    ahead = jobs.queue_position(job.id)
+    if ahead:
+        message = f"Waiting for a free worker ({ahead} job{'s' if ahead > 1 else ''} ahead)..."
+    st.markdown(
+        f'<div class="glass card"><div class="card-header"><span class="icon">{icon}</span>{message}</div></div>',
+        unsafe_allow_html=True
+    )
+    # Driven by the audio offset of the last window the decoder finished
+    st.progress(job.fraction)
+    details = [f"{format_duration(time.time() - job.created)} elapsed"]
+    if job.audio_total:
+        details.append(f"{format_duration(job.audio_done)} / {format_duration(job.audio_total)} of audio")
+    if job.audio_skipped:
+        details.append(f"{format_duration(job.audio_skipped)} of silence skipped")
+    if job.real_time_factor is not None:
+        details.append(f"RTF {job.real_time_factor:.2f}")
+        details.append(f"ETA {format_duration(job.eta)}")
+    st.markdown(f'<div style="text-align: center; color: var(--light);">{" · ".join(details)}</div>', unsafe_allow_html=True)
+    if job.cancel_requested:
+        st.caption("Cancelling...")
+    elif st.button("✖ Cancel", key="cancel_job", use_container_width=True):
+        jobs.cancel(job.id)
+
+@st.fragment(run_every=2.0)
+def show_partial_subtitles():
+    """Show the segments decoded so far while the job is still running"""
+    job = jobs.get(st.session_state.job_id)
+    if job is None or not job.partial:
+        return
+    partial = list(job.partial)
+    
+    st.markdown('<div class="glass card card-header"><span class="icon">📝</span>Subtitle Timeline (live)</div>', unsafe_allow_html=True)
+    st.caption(f"{len(partial)} subtitles so far; the latest {min(len(partial), 50)} are shown.")
+    items = []
+    for subtitle in partial[-50:]:
+        start_formatted = f"{int(subtitle['start']//60):02d}:{int(subtitle['start']%60):02d}"
+        end_formatted = f"{int(subtitle['end']//60):02d}:{int(subtitle['end']%60):02d}"
+        items.append(
+            f'<div class="subtitle-item"><div class="subtitle-time">🕒 {start_formatted} - {end_formatted}</div>'
+            f'<div class="subtitle-text">{html.escape(subtitle["text"])}</div></div>'
         )
-        time.sleep(1.5)
-        progress_bar.empty()
-        status_text.empty()
-        
-        return subtitles
-        
-    except Exception as e:
-        st.error(f"Error generating subtitles: {str(e)}")
-        return None
+    st.markdown(f'<div class="subtitle-timeline" style="max-height: 420px; overflow-y: auto;">{"".join(items)}</div>', unsafe_allow_html=True)
+    st.download_button(
+        label="⬇️ Download partial VTT",
+        data=formats.to_vtt(partial),
+        file_name=f"{os.path.splitext(job.meta['name'] or 'subtitles')[0]}_partial.vtt",
+        mime="text/vtt",
+        key="download_partial_vtt"
+    )
 
-def get_subtitle_at_time(subtitles, current_time):
+def get_subtitle_at_time(subtitles, current_time, index=None):
     """Get the subtitle text for the current time"""
     if not subtitles:
         return ""
     
+    if index is not None:
+        cue_id = index.first_at(current_time)
+        return subtitles[cue_id]['text'] if cue_id is not None else ""
     for subtitle in subtitles:
         if subtitle['start'] <= current_time <= subtitle['end']:
             return subtitle['text']
     return ""
 
-def create_vtt_file(subtitles):
-    """Create a VTT file content from subtitles"""
-    vtt_content = "WEBVTT\n\n"
-    for subtitle in subtitles:
-        start_time = format_timestamp(subtitle['start'])
-        end_time = format_timestamp(subtitle['end'])
-        text = subtitle['text']
-        vtt_content += f"{start_time} --> {end_time}\n{text}\n\n"
-    return vtt_content
+def publish_vtt(vtt_buffer):
+    """Serve the session's subtitles as VTT and return a cache-busting URL"""
+    st.session_state.vtt_version += 1
+    # Served straight from the buffer, so a save does not copy the document.
+    # Publishing a new buffer replaces the previous one of this session.
+    url = media_server.publish_buffer(st.session_state.vtt_name, vtt_buffer, "text/vtt; charset=utf-8")
+    return f"{url}?v={st.session_state.vtt_version}"
+
+def exported(fmt):
+    """Return the subtitles serialized as `fmt`, reused until the next edit"""
+    exports = st.session_state.exports
+    if exports.get('version') != st.session_state.vtt_version:
+        exports.clear()
+        exports['version'] = st.session_state.vtt_version
+    if fmt not in exports:
+        if fmt == "vtt":
+            exports[fmt] = st.session_state.vtt_buffer.getvalue()
+        else:
+            exports[fmt] = formats.dumps(fmt, st.session_state.subtitles)
+    return exports[fmt]
+
+def preview_file(video_path, digest, use_proxy):
+    """Return (path, mime type) of the low-bitrate proxy if ready, else the original"""
+    if use_proxy and digest:
+        proxy = preview.proxy_path(digest)
+        if proxy:
+            return proxy, "video/mp4"
+    return video_path, mimetypes.guess_type(video_path)[0] or "video/mp4"
+
+def preview_source(video_path, digest, use_proxy):
+    """Return (url, mime type) of the preview file on the media server"""
+    path, video_type = preview_file(video_path, digest, use_proxy)
+    return media_server.publish_file(path, video_type), video_type
+
+def browser_host():
+    """Return the host the browser reached the app at, or None if unknown"""
+    context = getattr(st, "context", None)
+    try:
+        return context.headers.get("Host") if context is not None else None
+    except Exception:
+        return None
+
+# The timeline renders one page of cues at a time, so a long video costs the
+# same to redraw as a short one; edits on a page are saved together.
+TIMELINE_PAGE_SIZES = [25, 50, 100]
+
+def parse_time(text):
+    """Parse seconds, M:SS or H:MM:SS into seconds, or None"""
+    try:
+        seconds = 0.0
+        for part in text.strip().split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds if seconds >= 0 else None
+    except ValueError:
+        return None
+
+def timeline_matches(subtitles, query):
+    """Return the indices of the subtitles containing query, ignoring case"""
+    query = query.strip().lower()
+    if not query:
+        return list(range(len(subtitles)))
+    return [i for i, subtitle in enumerate(subtitles) if query in subtitle['text'].lower()]
 
-def get_base64_encoded_file(file_path):
-    """Return base64 encoded file"""
-    with open(file_path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+def reset_timeline_page():
+    st.session_state.timeline_page = 1
+
+def jump_to_time():
+    """Open the page holding the cue on screen at the entered time, or the next one"""
+    t = parse_time(st.session_state.timeline_jump)
+    if t is None or st.session_state.cue_index is None:
+        return
+    cue_id = st.session_state.cue_index.next_at(t)
+    if cue_id is None:
+        return
+    matches = timeline_matches(st.session_state.subtitles, st.session_state.get("timeline_search", ""))
+    position = min(bisect_left(matches, cue_id), max(len(matches) - 1, 0))
+    st.session_state.timeline_page = position // st.session_state.get("timeline_page_size", TIMELINE_PAGE_SIZES[0]) + 1
+
+@st.fragment
+def show_timeline():
+    """Render one page of the subtitle timeline and save its edits together"""
+    subtitles = st.session_state.subtitles
+    search_col, jump_col, size_col = st.columns([3, 2, 1])
+    with search_col:
+        query = st.text_input("Search subtitles", key="timeline_search", on_change=reset_timeline_page)
+    with jump_col:
+        st.text_input("Jump to time", key="timeline_jump", placeholder="M:SS", on_change=jump_to_time)
+    with size_col:
+        page_size = st.selectbox("Per page", TIMELINE_PAGE_SIZES, key="timeline_page_size", on_change=reset_timeline_page)
+
+    matches = timeline_matches(subtitles, query)
+    if not matches:
+        st.caption("No subtitles match your search.")
+        return
+    pages = (len(matches) + page_size - 1) // page_size
+    if st.session_state.pop('reset_timeline', False):
+        st.session_state.timeline_page = 1
+    st.session_state.timeline_page = min(max(st.session_state.timeline_page, 1), pages)
+    vtt_buffer = st.session_state.vtt_buffer
+    page_col, undo_col, redo_col = st.columns([4, 1, 1])
+    with page_col:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="timeline_page")
+    with undo_col:
+        undo = st.button("↶ Undo", disabled=not vtt_buffer.can_undo, use_container_width=True)
+    with redo_col:
+        redo = st.button("↷ Redo", disabled=not vtt_buffer.can_redo, use_container_width=True)
+    if (undo and vtt_buffer.undo()) or (redo and vtt_buffer.redo()):
+        st.session_state.vtt_url = publish_vtt(vtt_buffer)
+        st.rerun()
+    visible = matches[(page - 1) * page_size:page * page_size]
+    st.caption(f"Showing {len(visible)} of {len(matches)} subtitles")
+
+    with st.form("timeline_edits"):
+        edits = {}
+        for i in visible:
+            subtitle = subtitles[i]
+            label = f"🕒 {format_duration(subtitle['start'])} - {format_duration(subtitle['end'])}"
+            # Keys change with every published version so saved or regenerated text is never stale
+            edits[i] = st.text_area(label, value=subtitle['text'], key=f"edit_{st.session_state.vtt_version}_{i}", height=80)
+        saved = st.form_submit_button("Save changes", type="primary")
+
+    if saved:
+        # Only the edited cues are re-encoded and patched into the VTT
+        if not vtt_buffer.edit(edits):
+            st.info("No changes to save.")
+            return
+        st.session_state.vtt_url = publish_vtt(vtt_buffer)
+        # One full rerun so the player picks up the new subtitle track
+        st.rerun()
 
 # Main UI
 st.markdown('<h1 class="main-header floating">SubGEN Pro: AI Subtitle Generator</h1>', unsafe_allow_html=True)
@@ -459,6 +698,38 @@ with st.sidebar:
             help="Larger models are more accurate but slower"
         )
         
+        precision = st.selectbox(
+            "**Precision**",
+            ["Full (FP32)", "Quantized (INT8, CPU)"],
+            help="INT8 runs a dynamically quantized model on the CPU: faster and smaller, slightly less accurate"
+        )
+        dtype = "int8" if precision.startswith("Quantized") else None
+        
+        workers = st.number_input(
+            "**CPU Workers**",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=min(settings.TRANSCRIBE_WORKERS, os.cpu_count() or 1),
+            help="Long media is split at pauses and transcribed in parallel by this many processes"
+        )
+        
+        skip_silence = st.checkbox(
+            "**Skip silence**",
+            value=settings.VAD,
+            help="Detect speech first and transcribe only the speech; faster on recordings with long pauses"
+        )
+        
+        profile_run = st.toggle(
+            "**Profile transcriptions**",
+            help="Profile the transcription with cProfile and the torch profiler and save a flamegraph trace and a hotspot summary"
+        )
+        
+        use_proxy = st.checkbox(
+            "**Low-bitrate preview**",
+            value=settings.PREVIEW_PROXY,
+            help=f"Play a {settings.PREVIEW_HEIGHT}p copy in the preview player once it has been encoded in the background"
+        )
+        
         st.markdown("""
         <div class="card" style="margin-top: 1.5rem;">
         <div style="background: rgba(64, 224, 208, 0.15); padding: 1rem; border-radius: 10px; margin-top: 1rem;">
@@ -511,14 +782,18 @@ with col1:
         )
         
         if uploaded_file is not None:
-            # Save uploaded file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                video_path = tmp_file.name
-                st.session_state.video_path = video_path
+            # Save the upload once; reruns and other sessions reuse the stored file
+            video_path, upload_size, upload_digest = uploads.store_upload(uploaded_file)
+            st.session_state.video_path = video_path
+            st.session_state.video_digest = upload_digest
+            st.session_state.video_name = uploaded_file.name
+            
+            # Start encoding the preview proxy while the user sets up transcription
+            if use_proxy:
+                preview.start_proxy(video_path, upload_digest)
             
             # Display file info
-            file_size = len(uploaded_file.getvalue()) / (1024 * 1024)
+            file_size = upload_size / (1024 * 1024)
             st.markdown(f"""
                 <div style="display: flex; align-items: center; justify-content: space-between;">
                     <div style="display: flex; align-items: center; gap: 1rem;">
@@ -535,52 +810,63 @@ with col1:
             
             # Generate subtitles button with custom style
             st.markdown('<div class="generate-btn" style="margin-top: 1.5rem;">', unsafe_allow_html=True)
-            if st.button("🚀 Generate Subtitles", type="primary", use_container_width=True):
-                st.session_state.processing = True
-                
-                with st.spinner(""):
-                    st.markdown('<div style="text-align: center; font-size: 1.5rem; padding: 2rem; color: var(--primary);">Processing your media... ⚙️</div>', unsafe_allow_html=True)
-                    subtitles = generate_subtitles(video_path, model_type)
-                    if subtitles:
-                        st.session_state.subtitles = subtitles
-                        st.session_state.processing = False
-                        
-                        # Encode video and subtitles for embedding
-                        try:
-                            # Encode video
-                            with open(video_path, "rb") as video_file:
-                                video_bytes = video_file.read()
-                                st.session_state.video_base64 = base64.b64encode(video_bytes).decode('utf-8')
-                            
-                            # Encode VTT
-                            vtt_content = create_vtt_file(subtitles)
-                            st.session_state.vtt_base64 = base64.b64encode(vtt_content.encode('utf-8')).decode('utf-8')
-                        except Exception as e:
-                            st.error(f"Error preparing video: {str(e)}")
-                        
-                        st.rerun()
+            if st.button("🚀 Generate Subtitles", type="primary", use_container_width=True, disabled=st.session_state.processing):
+                try:
+                    job = generate_subtitles(video_path, model_type, workers, upload_digest, uploaded_file.name, skip_silence, dtype, profile_run)
+                except jobs.QueueFull:
+                    st.warning("The server is busy with other transcriptions. Please try again in a few minutes.")
+                else:
+                    st.session_state.job_id = job.id
+                    st.session_state.processing = True
+                    # Keep the job in the URL so a browser refresh reattaches to it
+                    st.query_params["job"] = job.id
+                    st.rerun()
             st.markdown('</div>', unsafe_allow_html=True)
                     
         st.markdown('</div>', unsafe_allow_html=True)  # Close card
         
+        if st.session_state.job_message:
+            st.error(st.session_state.job_message)
+            st.session_state.job_message = None
+        if st.session_state.job_notice:
+            st.info(st.session_state.job_notice)
+            st.session_state.job_notice = None
+        
+        # Segments appear here as soon as they are decoded
+        if st.session_state.job_id:
+            show_partial_subtitles()
+        
         # Video Preview Section
         if st.session_state.video_path and st.session_state.subtitles:
-            if st.session_state.video_base64 and st.session_state.vtt_base64:
+            if not media_server.reachable(browser_host()):
+                # Only Streamlit's port is known to be reachable, e.g. on a
+                # hosted deployment: play through Streamlit's media endpoint,
+                # which sends the whole file instead of byte ranges
+                path, video_type = preview_file(st.session_state.video_path, st.session_state.video_digest, use_proxy)
+                st.markdown('<div class="card-header"><span class="icon">🎥</span>Video Preview</div>', unsafe_allow_html=True)
+                st.video(path, format=video_type, subtitles={"English": exported("vtt")})
+            elif st.session_state.video_url and st.session_state.vtt_url:
+                # Switch to the proxy as soon as its background encode finishes
+                st.session_state.video_url, video_type = preview_source(
+                    st.session_state.video_path, st.session_state.video_digest, use_proxy
+                )
                 # Create HTML video player with embedded subtitles
                 video_html = f"""
                 <div class="card" style="margin-top: 1.5rem;">
                 <div class="video-container">
                 <div class="card-header"><span class="icon">🎥</span>Video Preview</div>
                 <hr class="glass-alt" style="border: 1px solid var(--primary); margin: 1.5rem 0;">
-                    <video width="100%" height="100%" controls style="border-radius: 10px; background: #000;">
-                        <source src="data:video/mp4;base64,{st.session_state.video_base64}" type="video/mp4">
-                        <track src="data:text/vtt;base64,{st.session_state.vtt_base64}" kind="subtitles" 
+                    <video width="100%" height="100%" controls preload="metadata" crossorigin="anonymous" style="border-radius: 10px; background: #000;">
+                        <source src="{st.session_state.video_url}" type="{video_type}">
+                        <track src="{st.session_state.vtt_url}" kind="subtitles" 
                                srclang="en" label="English" default>
                         Your browser does not support the video tag.
                     </video>
                 </div>
                 """
                 st.markdown(video_html, unsafe_allow_html=True)
+                if use_proxy and preview.is_encoding(st.session_state.video_digest):
+                    st.caption("Low-bitrate preview is still encoding; playing the original file for now.")
             else:
                 st.warning("Video content not available. Please regenerate subtitles.")
             
@@ -588,41 +874,8 @@ with col1:
             
             # Subtitle Editor Section
             st.markdown('<div class="glass card card-header"><span class="icon">📝</span>Subtitle Timeline</div>', unsafe_allow_html=True)
-            st.info("Click on any subtitle to edit its text. Changes will be reflected in the video player.")
-            
-            # Create a scrollable container for subtitles
-            subtitle_container = st.container()
-            with subtitle_container:
-                for i, subtitle in enumerate(st.session_state.subtitles):
-                    start_time = subtitle['start']
-                    end_time = subtitle['end']
-                    text = subtitle['text']
-                    
-                    # Format time display
-                    start_formatted = f"{int(start_time//60):02d}:{int(start_time%60):02d}"
-                    end_formatted = f"{int(end_time//60):02d}:{int(end_time%60):02d}"
-                    
-                    with st.expander(f"🕒 {start_formatted} - {end_formatted}", expanded=False):
-                        # Display current subtitle
-                        st.markdown(f'<div class="subtitle-text">{text}</div>', unsafe_allow_html=True)
-                        
-                        # Edit subtitle option
-                        edited_text = st.text_area(
-                            "Edit subtitle:",
-                            value=text,
-                            key=f"edit_{i}",
-                            height=100
-                        )
-                        
-                        if st.button(f"Update Subtitle {i+1}", key=f"update_{i}"):
-                            st.session_state.subtitles[i]['text'] = edited_text
-                            
-                            # Update VTT content
-                            vtt_content = create_vtt_file(st.session_state.subtitles)
-                            st.session_state.vtt_base64 = base64.b64encode(vtt_content.encode('utf-8')).decode('utf-8')
-                            
-                            st.success("Subtitle updated! Refresh the page to see changes in the video player.")
-                            st.rerun()
+            st.info("Search or jump to a time, edit any subtitles on the page, then save them together.")
+            show_timeline()
             
             st.markdown('</div>', unsafe_allow_html=True)  # Close card
 
@@ -632,15 +885,8 @@ with col2:
         with st.container():
             st.markdown('<div class="glass-alt card card-header"><span class="icon">⏳</span>Processing</div>', unsafe_allow_html=True)
             
-            # Simulated progress bar
-            progress_bar = st.progress(0)
-            progress_text = st.empty()
-            
-            # Simulate progress
-            for percent_complete in range(100):
-                time.sleep(0.05)
-                progress_bar.progress(percent_complete + 1)
-                progress_text.markdown(f'<div style="text-align: center; color: var(--light);">{percent_complete + 1}% complete</div>', unsafe_allow_html=True)
+            # Polls the background job without blocking the rest of the page
+            show_job_status()
             
             st.markdown('</div>', unsafe_allow_html=True)  # Close card
     
@@ -649,22 +895,40 @@ with col2:
         with st.container():
             st.markdown('<div class="glass-alt card card-header"><span class="icon">📥</span>Export Subtitles</div>', unsafe_allow_html=True)
             
+            base_name = os.path.splitext(st.session_state.video_name)[0]
+            
             # Download VTT file
-            vtt_content = create_vtt_file(st.session_state.subtitles)
             st.download_button(
                 label="⬇️ Download VTT File",
-                data=vtt_content,
-                file_name=f"{os.path.splitext(uploaded_file.name)[0]}.vtt",
+                data=exported("vtt"),
+                file_name=f"{base_name}.vtt",
                 mime="text/vtt",
                 use_container_width=True
             )
             
+            # Download SRT file
+            st.download_button(
+                label="⬇️ Download SRT File",
+                data=exported("srt"),
+                file_name=f"{base_name}.srt",
+                mime="application/x-subrip",
+                use_container_width=True
+            )
+            
+            # Download ASS file
+            st.download_button(
+                label="⬇️ Download ASS File",
+                data=exported("ass"),
+                file_name=f"{base_name}.ass",
+                mime="text/x-ssa",
+                use_container_width=True
+            )
+            
             # Download JSON file
-            json_content = json.dumps(st.session_state.subtitles, indent=2)
             st.download_button(
                 label="⬇️ Download JSON",
-                data=json_content,
-                file_name=f"{os.path.splitext(uploaded_file.name)[0]}_subtitles.json",
+                data=exported("json"),
+                file_name=f"{base_name}_subtitles.json",
                 mime="application/json",
                 use_container_width=True
             )
@@ -729,3 +993,7 @@ st.markdown("""
     </div>
 </div>
 """, unsafe_allow_html=True)
+
+# Load the configured Whisper models (SUBGEN_WARM_MODELS) in the background,
+# once per server process and only after the page has been drawn
+model_pool.warm_up()
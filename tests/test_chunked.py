@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+import pytest
+
+import chunked
+
+SR = chunked.SAMPLE_RATE
+
+
+def _speech_with_pauses(seconds, pause_every, pause_seconds=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    samples = (0.3 * rng.standard_normal(int(seconds * SR))).astype(np.float32)
+    for start in np.arange(pause_every, seconds, pause_every):
+        samples[int(start * SR):int((start + pause_seconds) * SR)] = 0.0
+    return samples
+
+
+def _assert_monotonic(segments):
+    previous_end = 0.0
+    for segment in segments:
+        assert segment['start'] >= previous_end
+        assert segment['end'] >= segment['start']
+        previous_end = segment['end']
+
+
+def test_split_points_cover_the_audio_contiguously():
+    samples = _speech_with_pauses(100, 7)
+    points = chunked.split_points(samples, chunk_seconds=20, search_seconds=3)
+    assert points[0][0] == 0
+    assert points[-1][1] == len(samples)
+    for (_, end), (start, _) in zip(points, points[1:]):
+        assert end == start
+    for start, end in points:
+        assert 0 < end - start <= 23 * SR
+
+
+def test_split_points_cut_in_silence():
+    samples = _speech_with_pauses(100, 7)
+    for _, end in chunked.split_points(samples, chunk_seconds=20, search_seconds=3)[:-1]:
+        assert np.all(samples[end:end + int(0.03 * SR)] == 0.0)
+
+
+def test_short_audio_is_one_chunk():
+    samples = np.zeros(5 * SR, dtype=np.float32)
+    assert chunked.split_points(samples, chunk_seconds=20) == [(0, len(samples))]
+
+
+def test_stitch_clamps_overlapping_segments():
+    chunks = [
+        [{'start': 0.0, 'end': 10.5, 'text': 'a'}],
+        # Starts before the previous chunk's last segment ended
+        [{'start': 10.0, 'end': 12.0, 'text': 'b'}, {'start': 12.0, 'end': 15.0, 'text': 'c'}],
+    ]
+    stitched = chunked.stitch(chunks)
+    _assert_monotonic(stitched)
+    assert [s['text'] for s in stitched] == ['a', 'b', 'c']
+    assert stitched[1]['start'] == 10.5
+
+
+def test_stitch_orders_out_of_order_segments():
+    chunks = [[
+        {'start': 5.0, 'end': 8.0, 'text': 'a'},
+        {'start': 3.0, 'end': 4.0, 'text': 'b'},
+        {'start': 9.0, 'end': 9.5, 'text': 'c'},
+    ]]
+    stitched = chunked.stitch(chunks)
+    _assert_monotonic(stitched)
+    assert stitched[1] == {'start': 8.0, 'end': 8.0, 'text': 'b'}
+
+
+def test_stitch_handles_segments_overrunning_the_chunk():
+    chunks = [
+        [{'start': 25.0, 'end': 34.0, 'text': 'a'}],
+        [{'start': 30.0, 'end': 33.0, 'text': 'b'}, {'start': 33.0, 'end': 40.0, 'text': 'c'}],
+    ]
+    stitched = chunked.stitch(chunks)
+    _assert_monotonic(stitched)
+    assert stitched[1]['start'] == stitched[1]['end'] == 34.0
+
+
+def test_stitch_continues_from_last_end():
+    stitched = chunked.stitch([[{'start': 1.0, 'end': 2.0, 'text': 'a'}]], last_end=1.5)
+    assert stitched == [{'start': 1.5, 'end': 2.0, 'text': 'a'}]
+
+
+class _FakeModel:
+    def transcribe(self, samples, task=None, **options):
+        seconds = len(samples) / SR
+        return {"segments": [{"start": 0.0, "end": seconds, "text": f" {seconds:.0f}s "}]}
+
+
+def _fake_init_worker(model_type, threads, dtype=None):
+    chunked._worker_model = _FakeModel()
+
+
+def _failing_init_worker(model_type, threads, dtype=None):
+    raise RuntimeError("no such model")
+
+
+def _slow_init_worker(model_type, threads, dtype=None):
+    time.sleep(3)
+    chunked._worker_model = _FakeModel()
+
+
+def test_chunks_are_transcribed_in_worker_processes(monkeypatch):
+    monkeypatch.setattr(chunked, "_init_worker", _fake_init_worker)
+    samples = _speech_with_pauses(100, 7)
+    try:
+        segments = chunked.transcribe(samples, "fake", 2, chunk_seconds=20)
+    finally:
+        chunked.shutdown()
+    _assert_monotonic(segments)
+    assert segments[0]['start'] == 0.0
+    assert abs(segments[-1]['end'] - 100.0) < 0.01
+
+
+def test_workers_that_fail_to_start_fail_the_transcription(monkeypatch):
+    monkeypatch.setattr(chunked, "_init_worker", _failing_init_worker)
+    samples = _speech_with_pauses(60, 7)
+    try:
+        with pytest.raises(RuntimeError, match="failed"):
+            chunked.load("broken", 2)
+        with pytest.raises(RuntimeError, match="failed"):
+            chunked.transcribe(samples, "broken", 2, chunk_seconds=20)
+    finally:
+        chunked.shutdown()
+    assert ("broken", 2, None) not in chunked._pools
+
+
+def test_waiting_can_be_cancelled(monkeypatch):
+    monkeypatch.setattr(chunked, "_init_worker", _slow_init_worker)
+    monkeypatch.setattr(chunked, "WAIT_SECONDS", 0.01)
+
+    class Cancelled(Exception):
+        pass
+
+    def on_wait():
+        raise Cancelled()
+
+    started = time.perf_counter()
+    try:
+        with pytest.raises(Cancelled):
+            chunked.load("slow", 1, on_wait=on_wait)
+        assert time.perf_counter() - started < 2
+    finally:
+        chunked.shutdown()
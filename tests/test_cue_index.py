@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from cue_index import CueIndex
+
+
+def _scan_at(cues, t):
+    return {cue_id for cue_id, (start, end) in cues.items() if start <= t <= end}
+
+
+def _scan_between(cues, t0, t1):
+    return {cue_id for cue_id, (start, end) in cues.items() if start <= t1 and end >= t0}
+
+
+def _assert_found(cues, found, expected):
+    # The same cues, ordered by start time; cues starting together come in any order
+    assert len(found) == len(set(found))
+    assert set(found) == expected
+    starts = [cues[cue_id][0] for cue_id in found]
+    assert starts == sorted(starts)
+
+
+def _random_cue(rng):
+    # Coarse times, so starts and ends often coincide; long cues overlap many others
+    start = rng.randrange(0, 200) / 2
+    return start, start + rng.choice([0, 0.5, 1, 2, 5, 30])
+
+
+def _check(index, cues, rng):
+    assert len(index) == len(cues)
+    for _ in range(40):
+        t = rng.randrange(-4, 480) / 4
+        expected = _scan_at(cues, t)
+        _assert_found(cues, index.at(t), expected)
+        assert index.first_at(t) == (min(expected) if expected else None)
+        t1 = t + rng.randrange(0, 40) / 4
+        _assert_found(cues, index.between(t, t1), _scan_between(cues, t, t1))
+
+
+def test_overlapping_cues_match_a_full_scan():
+    cues = {0: (0.0, 10.0), 1: (1.0, 2.0), 2: (1.0, 1.0), 3: (5.0, 6.0), 4: (9.0, 12.0)}
+    index = CueIndex([{'start': start, 'end': end} for start, end in cues.values()])
+    for t in [0, 1, 1.5, 2, 2.5, 6, 9.5, 10, 11, 12, 12.5]:
+        _assert_found(cues, index.at(t), _scan_at(cues, t))
+    assert index.between(2.5, 4) == [0]
+    assert index.next_at(12.5) is None
+    assert index.next_at(-1) == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_insert_remove_update_match_a_full_scan(seed):
+    rng = random.Random(seed)
+    cues = {cue_id: _random_cue(rng) for cue_id in range(30)}
+    index = CueIndex([{'start': start, 'end': end} for start, end in cues.values()])
+    _check(index, cues, rng)
+    next_id = len(cues)
+    for _ in range(200):
+        action = rng.random()
+        if action < 0.3 or not cues:
+            cues[next_id] = _random_cue(rng)
+            index.insert(next_id, *cues[next_id])
+            next_id += 1
+        elif action < 0.5:
+            cue_id = rng.choice(list(cues))
+            del cues[cue_id]
+            index.remove(cue_id)
+        elif action < 0.75:
+            # Same start, new end: the in-place path
+            cue_id = rng.choice(list(cues))
+            start = cues[cue_id][0]
+            cues[cue_id] = (start, start + rng.choice([0, 0.5, 3, 40]))
+            index.update(cue_id, *cues[cue_id])
+        else:
+            cue_id = rng.choice(list(cues))
+            cues[cue_id] = _random_cue(rng)
+            index.update(cue_id, *cues[cue_id])
+        _check(index, cues, rng)
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+import formats
+
+
+@pytest.mark.parametrize("seconds, expected", [
+    (0, "00:00:00.000"),
+    (1.5, "00:00:01.500"),
+    (3723.999, "01:02:03.999"),     # truncating the float gives .998
+    (0.29, "00:00:00.290"),
+    (59.9996, "00:01:00.000"),      # rounds up into the next minute
+    (3599.9999, "01:00:00.000"),
+    (36000 + 0.001, "10:00:00.001"),
+])
+def test_format_timestamp_rounds_to_milliseconds(seconds, expected):
+    assert formats.format_timestamp(seconds) == expected
+    assert formats.format_timestamp(seconds, ",") == expected.replace(".", ",")
+
+
+def test_every_millisecond_round_trips():
+    for ms in range(0, 4000000, 997):
+        stamp = formats.format_timestamp(ms / 1000)
+        hours, minutes, rest = stamp.split(":")
+        seconds, millis = rest.split(".")
+        assert ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis) == ms
+
+
+def test_documents():
+    segments = [{'start': 0.5, 'end': 1.25, 'text': "Hallo"}, {'start': 1.25, 'end': 3723.999, 'text': "Köln"}]
+    assert formats.to_vtt(segments) == (
+        "WEBVTT\n\n"
+        "00:00:00.500 --> 00:00:01.250\nHallo\n\n"
+        "00:00:01.250 --> 01:02:03.999\nKöln\n\n"
+    )
+    assert "00:00:01,250 --> 01:02:03,999" in formats.dumps("srt", segments)
+    assert json.loads(formats.dumps("json", segments)) == segments
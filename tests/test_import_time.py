@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Cold start of the app and the CLI: every module they import before a
+# transcription starts loads in a fresh interpreter, within budget and without
+# torch or whisper, which are imported on first use.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3                    # the best run is compared with the budget
+MODULE_BUDGET = 0.5         # seconds per module
+ENTRY_BUDGET = 0.8          # seconds per entry point
+
+# What subtitles.py and Offline.py import before any transcription starts
+MODULES = [
+    "settings", "formats", "cue_index", "vtt_buffer", "disk_cache", "uploads", "jobs",
+    "media_server", "preview", "result_cache", "audio", "progress", "chunked",
+    "model_pool", "pipeline",
+]
+HEAVY = ["torch", "whisper", "tiktoken", "numba"]
+
+REPORT = """
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+""" + REPORT
+
+CLI_PROBE = """
+import json, runpy, sys, time
+sys.argv = ["Offline.py", "--help"]
+started = time.perf_counter()
+try:
+    runpy.run_path("Offline.py", run_name="__main__")
+except SystemExit:
+    pass
+""" + REPORT
+
+# Timed from after streamlit itself is imported: one run of the script, as
+# for the first page view
+APP_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+app = AppTest.from_file("subtitles.py", default_timeout=120).run()
+if app.exception:
+    raise SystemExit(app.exception[0].value)
+""" + REPORT
+
+
+def _local_modules():
+    return {os.path.splitext(name)[0] for name in os.listdir(ROOT) if name.endswith(".py")}
+
+
+def _measure(probe):
+    """Return (best seconds, heavy modules loaded) over RUNS fresh interpreters"""
+    best, heavy = None, []
+    for _ in range(RUNS):
+        run = subprocess.run([sys.executable, "-c", probe.format(heavy=HEAVY)],
+                             cwd=ROOT, capture_output=True, text=True)
+        if run.returncode != 0:
+            missing = run.stderr.strip().splitlines()[-1] if run.stderr.strip() else ""
+            if "ModuleNotFoundError" in missing:
+                name = missing.split("'")[1].split(".")[0]
+                # A third-party dependency missing here; a module of this repo must exist
+                if name not in _local_modules():
+                    pytest.skip(f"{name} is not installed")
+            pytest.fail(run.stderr)
+        result = json.loads(run.stdout.strip().splitlines()[-1])
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        heavy = result["heavy"]
+    return best, heavy
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_module_imports_fast(module):
+    seconds, heavy = _measure(PROBE.replace("{module}", module))
+    assert heavy == []
+    assert seconds < MODULE_BUDGET
+
+
+def test_cli_starts_fast():
+    seconds, heavy = _measure(CLI_PROBE)
+    assert heavy == []
+    assert seconds < ENTRY_BUDGET
+
+
+def test_app_starts_fast():
+    pytest.importorskip("streamlit.testing.v1")
+    seconds, heavy = _measure(APP_PROBE)
+    assert heavy == []
+    assert seconds < ENTRY_BUDGET
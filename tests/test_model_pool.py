@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+import model_pool
+
+
+class StubModel:
+    """Records how many transcriptions run on it at the same time"""
+
+    def __init__(self):
+        self.running = 0
+        self.most_running = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, samples, **options):
+        with self._lock:
+            self.running += 1
+            self.calls += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        return {"segments": []}
+
+
+def _run_jobs(size, count=4, runs=5):
+    def job():
+        for _ in range(runs):
+            with model_pool.using(size, device="cpu", dtype="fp32") as model:
+                model.transcribe(None)
+
+    threads = [threading.Thread(target=job) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_jobs_never_share_a_model_at_once(monkeypatch):
+    stub = StubModel()
+    monkeypatch.setitem(model_pool._models, ("stub", "cpu", "fp32"), (stub, 1.0))
+    _run_jobs("stub")
+    assert stub.calls == 20
+    assert stub.most_running == 1
+
+
+def test_different_models_run_side_by_side(monkeypatch):
+    first, second = StubModel(), StubModel()
+    monkeypatch.setitem(model_pool._models, ("first", "cpu", "fp32"), (first, 1.0))
+    monkeypatch.setitem(model_pool._models, ("second", "cpu", "fp32"), (second, 1.0))
+    both = threading.Barrier(2, timeout=5)
+
+    def job(size):
+        with model_pool.using(size, device="cpu", dtype="fp32"):
+            # Both checked out at once, or the barrier times out
+            both.wait()
+
+    threads = [threading.Thread(target=job, args=(size,)) for size in ("first", "second")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not both.broken
+
+
+def test_waiting_for_a_model_can_be_cancelled(monkeypatch):
+    monkeypatch.setitem(model_pool._models, ("stub", "cpu", "fp32"), (StubModel(), 1.0))
+    monkeypatch.setattr(model_pool, "WAIT_SECONDS", 0.01)
+
+    class Cancelled(Exception):
+        pass
+
+    def on_wait():
+        raise Cancelled()
+
+    with model_pool.using("stub", device="cpu", dtype="fp32"):
+        with pytest.raises(Cancelled):
+            with model_pool.using("stub", device="cpu", dtype="fp32", on_wait=on_wait):
+                pass
+    # Released again after the cancelled wait
+    with model_pool.using("stub", device="cpu", dtype="fp32"):
+        pass
@@ -0,0 +1,31 @@
+import threading
+
+import scheduler
+
+
+def test_share_splits_the_cores_between_running_jobs(monkeypatch):
+    monkeypatch.setattr(scheduler, "_CORES", list(range(8)))
+    monkeypatch.setattr(scheduler.settings, "PIN_CORES", False)
+    assert scheduler.share() == 8
+
+    started = threading.Barrier(3)
+    release = threading.Event()
+    shares = []
+
+    def job():
+        with scheduler.cpu_share():
+            started.wait()
+            release.wait()
+            shares.append(scheduler.share())
+
+    threads = [threading.Thread(target=job) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    # Outside a job the whole machine counts
+    assert scheduler.share() == 8
+    release.set()
+    for thread in threads:
+        thread.join()
+    # Each of the two jobs sees half, or all once the other has finished
+    assert sorted(shares) in ([4, 4], [4, 8])
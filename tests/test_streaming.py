@@ -0,0 +1,126 @@
+import importlib
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+whisper_audio = pytest.importorskip("whisper.audio")
+
+import streaming
+
+N_FRAMES = whisper_audio.N_FRAMES
+
+
+def _source(tmp_path, seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * whisper_audio.SAMPLE_RATE)) / whisper_audio.SAMPLE_RATE
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0) + 0.05 * rng.standard_normal(len(t))
+    pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+    path = tmp_path / "audio.16k.pcm"
+    pcm.tofile(path)
+    return streaming.PcmSource(str(path)), torch.from_numpy(pcm.astype(np.float32) / 32768.0)
+
+
+@pytest.mark.parametrize("n_mels", [80, 128])
+def test_windows_match_whisper(tmp_path, n_mels):
+    source, samples = _source(tmp_path, 75)
+    expected = whisper_audio.log_mel_spectrogram(samples, n_mels, padding=whisper_audio.N_SAMPLES)
+    mel = streaming.LazyMel(source, n_mels, whisper_audio.N_SAMPLES)
+    assert mel.shape == tuple(expected.shape)
+
+    total = mel.shape[1]
+    windows = [
+        (0, N_FRAMES),                  # reflect padding at the start
+        (N_FRAMES, 2 * N_FRAMES),
+        (1234, 1234 + N_FRAMES),
+        (total - N_FRAMES, total),      # zero padding at the end
+    ]
+    for start, end in windows:
+        torch.testing.assert_close(mel[:, start:end], expected[:, start:end], atol=1e-4, rtol=1e-4)
+
+
+def test_language_detection_window_matches_whisper(tmp_path):
+    source, samples = _source(tmp_path, 45, seed=1)
+    expected = whisper_audio.log_mel_spectrogram(samples, 80, padding=whisper_audio.N_SAMPLES)
+    mel = streaming.LazyMel(source, 80, whisper_audio.N_SAMPLES)
+    torch.testing.assert_close(whisper_audio.pad_or_trim(mel, N_FRAMES),
+                               whisper_audio.pad_or_trim(expected, N_FRAMES), atol=1e-4, rtol=1e-4)
+
+
+def test_one_window_spectrogram_moves_to_device(tmp_path):
+    # Under 160 samples the padded spectrogram is exactly one window long and
+    # pad_or_trim() returns it unchanged
+    source, samples = _source(tmp_path, 0.005)
+    expected = whisper_audio.log_mel_spectrogram(samples, 80, padding=whisper_audio.N_SAMPLES)
+    mel = streaming.LazyMel(source, 80, whisper_audio.N_SAMPLES)
+    assert mel.shape == (80, N_FRAMES)
+    segment = whisper_audio.pad_or_trim(mel, N_FRAMES).to("cpu").to(torch.float32)
+    torch.testing.assert_close(segment, expected, atol=1e-4, rtol=1e-4)
+
+
+def test_whole_source_reuses_cached_spectrogram(tmp_path, monkeypatch):
+    # Recordings below STREAMING_MIN_SECONDS are computed whole by whisper and
+    # stored, so a second run with another model maps them from the cache
+    monkeypatch.setattr(streaming.settings, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(streaming.settings, "MEL_CACHE_MB", 64)
+    _, samples = _source(tmp_path, 40, seed=2)
+    path = str(tmp_path / "audio.16k.pcm")
+    streaming.source(path)
+    # What transcribe() calls, with streaming's dispatcher installed
+    log_mel = importlib.import_module("whisper.transcribe").log_mel_spectrogram
+    expected = whisper_audio.log_mel_spectrogram(samples, 80, padding=whisper_audio.N_SAMPLES)
+
+    first = log_mel(streaming.source(path, "digest", windowed=False), 80, padding=whisper_audio.N_SAMPLES)
+    assert torch.is_tensor(first)
+    torch.testing.assert_close(first, expected)
+
+    second = log_mel(streaming.source(path, "digest", windowed=False), 80, padding=whisper_audio.N_SAMPLES)
+    assert isinstance(second, streaming.MappedMel)
+    torch.testing.assert_close(second[:, 0:N_FRAMES], expected[:, :N_FRAMES])
+
+
+def _write_wav(path, seconds, seed=3):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * whisper_audio.SAMPLE_RATE)) / whisper_audio.SAMPLE_RATE
+    signal = 0.3 * np.sin(2 * np.pi * 180 * t * (1 + 0.2 * np.sin(2 * np.pi * 0.7 * t))) + 0.02 * rng.standard_normal(len(t))
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(whisper_audio.SAMPLE_RATE)
+        f.writeframes((np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def test_windowed_transcription_matches_in_memory(tmp_path, monkeypatch):
+    # End to end with a real model: the same clip through the pipeline once
+    # loaded whole and once read window by window gives the same segments
+    pytest.importorskip("ffmpeg")
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg is not installed")
+    import model_pool
+    import pipeline
+    try:
+        model_pool.get_model("tiny", device="cpu")
+    except Exception as e:
+        pytest.skip(f"the tiny model is not available: {e}")
+
+    media = tmp_path / "clip.wav"
+    _write_wav(media, 75)
+    monkeypatch.setattr(streaming.settings, "TRANSCRIBE_WORKERS", 1)
+    monkeypatch.setattr(streaming.settings, "VAD", False)
+    monkeypatch.setattr(streaming.settings, "MEL_CACHE_MB", 0)
+    monkeypatch.setattr(streaming.settings, "METRICS_FILE", "")
+
+    def run(name, min_seconds):
+        # A cache directory per run, so the second does not reuse the first's result
+        monkeypatch.setattr(streaming.settings, "CACHE_DIR", str(tmp_path / name))
+        monkeypatch.setattr(streaming.settings, "STREAMING_MIN_SECONDS", min_seconds)
+        return pipeline.transcribe(str(media), "tiny", task="transcribe", temperature=0.0)
+
+    in_memory = run("in-memory", 0)
+    windowed = run("windowed", 1)
+    assert [s["text"] for s in windowed] == [s["text"] for s in in_memory]
+    for got, expected in zip(windowed, in_memory):
+        assert got["start"] == pytest.approx(expected["start"], abs=0.02)
+        assert got["end"] == pytest.approx(expected["end"], abs=0.02)
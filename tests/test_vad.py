@@ -0,0 +1,48 @@
+import pytest
+
+from vad import SAMPLE_RATE, SpeechMap
+
+# Speech at 2-5 s, 10-12 s and 20-21 s of a 30 s recording, joined into 6 s:
+# the joins fall at 3 s and 5 s of the joined signal
+REGIONS = [(2 * SAMPLE_RATE, 5 * SAMPLE_RATE), (10 * SAMPLE_RATE, 12 * SAMPLE_RATE), (20 * SAMPLE_RATE, 21 * SAMPLE_RATE)]
+
+
+@pytest.fixture
+def speech_map():
+    return SpeechMap(REGIONS, 30 * SAMPLE_RATE)
+
+
+def test_seconds(speech_map):
+    assert speech_map.speech_seconds == 6
+    assert speech_map.total_seconds == 30
+    assert speech_map.skipped_seconds == 24
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (0.0, 1.0, (2.0, 3.0)),
+    (1.0, 3.0, (3.0, 5.0)),         # ends on a join: stays in the first region
+    (3.0, 4.0, (10.0, 11.0)),       # starts on a join: begins in the second region
+    (3.0, 5.0, (10.0, 12.0)),       # both on joins
+    (2.5, 3.5, (4.5, 10.5)),        # spans a join, and so the silence cut there
+    (5.0, 5.0, (20.0, 20.0)),       # zero length, on the last join
+    (5.5, 6.0, (20.5, 21.0)),
+    (6.0, 7.0, (21.0, 21.0)),       # past the end of the speech
+])
+def test_segment_on_joins(speech_map, start, end, expected):
+    segment = speech_map.segment({'start': start, 'end': end, 'text': "x"})
+    assert (segment['start'], segment['end']) == pytest.approx(expected)
+    assert segment['text'] == "x"
+
+
+def test_segments_stay_ordered_across_joins(speech_map):
+    times = [0.0, 1.0, 3.0, 3.0, 4.5, 5.0, 5.0, 6.0]
+    segments = [speech_map.segment({'start': a, 'end': b, 'text': ""}) for a, b in zip(times, times[1:])]
+    for segment in segments:
+        assert segment['end'] >= segment['start']
+    for before, after in zip(segments, segments[1:]):
+        assert after['start'] >= before['end']
+
+
+def test_without_speech_times_are_unchanged():
+    speech_map = SpeechMap([], 10 * SAMPLE_RATE)
+    assert speech_map.segment({'start': 1.0, 'end': 2.0, 'text': ""})['end'] == 2.0
@@ -0,0 +1,67 @@
+import copy
+import random
+
+import formats
+from vtt_buffer import HISTORY_LIMIT, VttBuffer
+
+TEXTS = ["Hello", "Grüße aus Köln", "日本語の字幕", "emoji 🎬🍿", "", "a\nsecond line", "ça va ? — oui"]
+
+
+def _segments(count):
+    return [{'start': i * 2.5, 'end': i * 2.5 + 2.0, 'text': TEXTS[i % len(TEXTS)]} for i in range(count)]
+
+
+def _assert_matches(buffer, segments):
+    expected = formats.to_vtt(segments).encode("utf-8")
+    assert buffer.getvalue() == expected
+    assert len(buffer) == len(expected)
+    # Ranged reads as the media server serves them
+    assert buffer.read(3, 40) == expected[3:40]
+    for cue_id in range(len(segments)):
+        assert expected[buffer.offset(cue_id):].startswith(formats.vtt_cue(segments[cue_id]).encode("utf-8"))
+
+
+def test_new_buffer_matches_to_vtt():
+    segments = _segments(20)
+    _assert_matches(VttBuffer(copy.deepcopy(segments)), segments)
+
+
+def test_edits_undo_and_redo_match_to_vtt():
+    rng = random.Random(0)
+    buffer = VttBuffer(_segments(40))
+    # The document as it should be after each step, oldest first
+    history = [copy.deepcopy(buffer.segments)]
+    position = 0
+    for _ in range(300):
+        action = rng.random()
+        if action < 0.5:
+            changes = {rng.randrange(40): rng.choice(TEXTS) + rng.choice(["", "!", " ✓"]) for _ in range(rng.randint(1, 4))}
+            if buffer.edit(changes):
+                del history[position + 1:]
+                history.append(copy.deepcopy(buffer.segments))
+                position += 1
+        elif action < 0.8:
+            if buffer.undo():
+                position -= 1
+        elif buffer.redo():
+            position += 1
+        _assert_matches(buffer, history[position])
+        assert buffer.can_undo == (position > 0)
+        assert buffer.can_redo == (position < len(history) - 1)
+
+
+def test_edit_to_same_text_is_not_a_step():
+    buffer = VttBuffer(_segments(3))
+    assert buffer.edit({1: buffer.segments[1]['text']}) == []
+    assert not buffer.can_undo
+
+
+def test_history_is_limited():
+    segments = _segments(2)
+    buffer = VttBuffer(copy.deepcopy(segments))
+    for i in range(HISTORY_LIMIT + 10):
+        buffer.edit({0: f"edit {i} ✓"})
+    while buffer.undo():
+        pass
+    assert buffer.segments[0]['text'] == "edit 9 ✓"
+    _assert_matches(buffer, [dict(segments[0], text="edit 9 ✓"), segments[1]])
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import disk_cache
+import metrics
+import settings
+
+# Upload handling for the Streamlit apps. An UploadedFile already holds the
+# upload in memory; it is written out through a memoryview in fixed-size
+# chunks so no further full copies are made, with the size and hash computed
+# in the same pass. Uploads are kept in a content-addressed store: each file
+# is written once, reused across reruns and sessions, and the store is trimmed
+# least recently used first to its disk quota.
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+_stored = {}  # Streamlit file id -> (path, size, digest)
+_lock = threading.Lock()
+
+
+def write_upload(uploaded_file, f, chunk_size=CHUNK_SIZE):
+    """Write an uploaded file to an open binary file, return (size, sha256)"""
+    h = hashlib.sha256()
+    view = uploaded_file.getbuffer()
+    try:
+        for offset in range(0, len(view), chunk_size):
+            chunk = view[offset:offset + chunk_size]
+            h.update(chunk)
+            f.write(chunk)
+        return len(view), h.hexdigest()
+    finally:
+        # The buffer pins the upload's storage until it is released
+        view.release()
+
+
+def store_upload(uploaded_file, directory=None):
+    """Save an upload to the store once and return (path, size, sha256)"""
+    directory = directory or settings.UPLOAD_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    # Streamlit hands the same file id to every rerun of one upload
+    file_id = (directory, getattr(uploaded_file, "file_id", None) or id(uploaded_file))
+    with _lock:
+        stored = _stored.get(file_id)
+    if stored and os.path.exists(stored[0]):
+        disk_cache.touch(stored[0])
+        return stored
+
+    suffix = os.path.splitext(uploaded_file.name)[1].lower()
+    with metrics.run("upload", name=uploaded_file.name) as run:
+        with metrics.stage("write"):
+            with tempfile.NamedTemporaryFile(delete=False, dir=directory, suffix=".tmp") as tmp_file:
+                size, digest = write_upload(uploaded_file, tmp_file)
+        path = os.path.join(directory, digest + suffix)
+        run.note(bytes=size, duplicate=os.path.exists(path))
+        if os.path.exists(path):
+            # Same content uploaded before, possibly by another session
+            os.remove(tmp_file.name)
+            disk_cache.touch(path)
+        else:
+            os.replace(tmp_file.name, path)
+        with metrics.stage("trim"):
+            disk_cache.trim(directory, settings.UPLOAD_QUOTA_MB * 1024 * 1024, keep=[path])
+
+    stored = (path, size, digest)
+    with _lock:
+        _stored[file_id] = stored
+    return stored
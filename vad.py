@@ -0,0 +1,97 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+import chunked
+import settings
+
+# Energy-based voice activity detection. Frames well above the recording's
+# noise floor are taken as speech; short pauses inside speech are kept and
+# every region is padded, so words are not clipped. The speech regions are
+# joined into one shorter signal for Whisper, and SpeechMap moves the
+# timestamps of the result back onto the original timeline.
+
+SAMPLE_RATE = chunked.SAMPLE_RATE
+MARGIN_DB = 12.0            # speech is at least this far above the noise floor
+SILENCE_DBFS = -60.0        # frames quieter than this are never speech
+MIN_SPEECH_SECONDS = 0.25
+
+
+def speech_regions(samples, min_silence_ms=None, pad_ms=None):
+    """Return (start, end) sample ranges that contain speech"""
+    min_silence_ms = settings.VAD_MIN_SILENCE_MS if min_silence_ms is None else min_silence_ms
+    pad_ms = settings.VAD_PAD_MS if pad_ms is None else pad_ms
+    energy = chunked.frame_energy(samples)
+    if len(energy) == 0:
+        return []
+    level = 10 * np.log10(energy + 1e-10)
+    floor, loud = np.percentile(level, [10, 95])
+    # Recordings that are speech throughout have no quiet floor to measure
+    # against, so the threshold is also kept below their loud level.
+    threshold = max(min(floor + MARGIN_DB, loud - MARGIN_DB), SILENCE_DBFS)
+    voiced = np.concatenate(([False], level > threshold, [False]))
+    edges = np.flatnonzero(voiced[1:] != voiced[:-1]).reshape(-1, 2)
+
+    frame = int(SAMPLE_RATE * chunked.FRAME_SECONDS)
+    pad = int(pad_ms / 1000 / chunked.FRAME_SECONDS)
+    gap = int(min_silence_ms / 1000 / chunked.FRAME_SECONDS)
+    regions = []
+    for start, end in edges:
+        start, end = max(0, start - pad), min(len(energy), end + pad)
+        if regions and start - regions[-1][1] < gap:
+            regions[-1][1] = max(regions[-1][1], end)
+        else:
+            regions.append([start, end])
+
+    ranges = []
+    for start, end in regions:
+        if (end - start) * chunked.FRAME_SECONDS < MIN_SPEECH_SECONDS:
+            continue
+        # The last frame absorbs the samples that do not fill a whole frame
+        end = len(samples) if end == len(energy) else end * frame
+        ranges.append((int(start) * frame, int(end)))
+    return ranges
+
+
+class SpeechMap:
+    def __init__(self, regions, total_samples):
+        self._compact = []      # start of each region in the joined signal, seconds
+        self._original = []     # start of each region in the media, seconds
+        self._lengths = []
+        position = 0
+        for start, end in regions:
+            self._compact.append(position / SAMPLE_RATE)
+            self._original.append(start / SAMPLE_RATE)
+            self._lengths.append((end - start) / SAMPLE_RATE)
+            position += end - start
+        self.speech_seconds = position / SAMPLE_RATE
+        self.total_seconds = total_samples / SAMPLE_RATE
+
+    @property
+    def skipped_seconds(self):
+        return self.total_seconds - self.speech_seconds
+
+    def to_original(self, t, end=False):
+        """Map a time in the joined signal back to the media timeline
+
+        An end time that falls exactly on a join belongs to the region before
+        it, so a segment never stretches over the silence that was cut.
+        """
+        if not self._compact:
+            return t
+        i = (bisect_left if end else bisect_right)(self._compact, t) - 1
+        i = max(i, 0)
+        return self._original[i] + min(max(t - self._compact[i], 0.0), self._lengths[i])
+
+    def segment(self, segment):
+        """Return a copy of a segment with its times on the media timeline"""
+        start = self.to_original(segment['start'])
+        end = max(self.to_original(segment['end'], end=True), start)
+        return dict(segment, start=start, end=end)
+
+
+def compact(samples, min_silence_ms=None, pad_ms=None):
+    """Return the speech of a signal joined together and its SpeechMap"""
+    regions = speech_regions(samples, min_silence_ms, pad_ms)
+    speech = np.concatenate([samples[start:end] for start, end in regions]) if regions else samples[:0]
+    return speech, SpeechMap(regions, len(samples))
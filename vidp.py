@@ -1,5 +1,5 @@
 import streamlit as st
-import os
+import uploads
 
 # Streamlit app
 def main():
@@ -13,11 +13,8 @@ def main():
         # Display the uploaded video
         st.video(uploaded_file)
 
-        # Save the uploaded file to disk
-        save_path = os.path.join("uploads", uploaded_file.name)
-        os.makedirs("uploads", exist_ok=True)  # Create the "uploads" directory if it doesn't exist
-        with open(save_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        # Save the uploaded file to the "uploads" store (written once per content)
+        save_path, _, _ = uploads.store_upload(uploaded_file, directory="uploads")
 
         # Display the file path
         st.write(f"**File saved at:** `{save_path}`")
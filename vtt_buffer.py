@@ -0,0 +1,103 @@
+import formats
+
+# Editable WebVTT document. The encoded document is kept in one bytearray and
+# the byte length of every cue in a Fenwick tree, so a text edit re-encodes only
+# the changed cue and splices it in place instead of regenerating the whole
+# file. Edit history is kept as (cue, old text, new text) diffs for undo/redo.
+
+HEADER = formats.VTT_HEADER.encode("utf-8")
+HISTORY_LIMIT = 200
+
+
+class VttBuffer:
+    def __init__(self, segments):
+        self.segments = segments
+        cues = [formats.vtt_cue(segment).encode("utf-8") for segment in segments]
+        self._data = bytearray(HEADER + b"".join(cues))
+        self._lengths = [len(cue) for cue in cues]
+        # Fenwick tree over the cue lengths, built in linear time
+        self._tree = [0] + self._lengths
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+        self._undo = []
+        self._redo = []
+
+    def __len__(self):
+        return len(self._data)
+
+    def offset(self, cue_id):
+        """Return the byte offset where a cue starts"""
+        total = len(HEADER)
+        i = cue_id
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _resize(self, cue_id, delta):
+        i = cue_id + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _set_text(self, cue_id, text):
+        self.segments[cue_id]['text'] = text
+        cue = formats.vtt_cue(self.segments[cue_id]).encode("utf-8")
+        start = self.offset(cue_id)
+        self._data[start:start + self._lengths[cue_id]] = cue
+        delta = len(cue) - self._lengths[cue_id]
+        if delta:
+            self._lengths[cue_id] = len(cue)
+            self._resize(cue_id, delta)
+
+    def edit(self, changes):
+        """Apply {cue id: new text} as one undoable step and return the changed ids"""
+        diff = [(cue_id, self.segments[cue_id]['text'], text)
+                for cue_id, text in changes.items() if text != self.segments[cue_id]['text']]
+        if not diff:
+            return []
+        for cue_id, _, text in diff:
+            self._set_text(cue_id, text)
+        self._undo.append(diff)
+        del self._undo[:-HISTORY_LIMIT]
+        self._redo.clear()
+        return [cue_id for cue_id, _, _ in diff]
+
+    def undo(self):
+        """Revert the last edit and return the changed ids"""
+        if not self._undo:
+            return []
+        diff = self._undo.pop()
+        for cue_id, old, _ in reversed(diff):
+            self._set_text(cue_id, old)
+        self._redo.append(diff)
+        return [cue_id for cue_id, _, _ in diff]
+
+    def redo(self):
+        """Reapply the last undone edit and return the changed ids"""
+        if not self._redo:
+            return []
+        diff = self._redo.pop()
+        for cue_id, _, new in diff:
+            self._set_text(cue_id, new)
+        self._undo.append(diff)
+        return [cue_id for cue_id, _, _ in diff]
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def read(self, start, end):
+        """Return bytes [start, end) of the current document"""
+        # One slice, atomic under the GIL, so edits from another thread are safe
+        return self._data[start:end]
+
+    def getvalue(self):
+        """Return the current document as bytes"""
+        return bytes(self._data)